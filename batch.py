@@ -0,0 +1,223 @@
+"""Headless batch runner for the portfolio apps.
+
+Runs one app over every matching file in the given directories, globs or paths and writes a
+DOCX/PDF/JSON report per file, e.g.:
+
+    python batch.py regulatory "regulations/*.pdf" --out reports --formats docx,json --workers 4
+    python batch.py meeting recordings/ --out reports --resume
+
+Finished files are appended to <out>/checkpoint.jsonl; with --resume, files whose content was
+already processed successfully in this mode are skipped.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from utils.export_utils import export_to_docx, export_to_pdf
+from utils.metrics_utils import get_metrics_registry, tagged
+from utils.pipeline_utils import MAX_WORKERS
+from utils.pipelines import EXTENSIONS, PIPELINES
+from utils.store_utils import file_digest
+
+FORMATS = ("docx", "pdf", "json")
+CHECKPOINT_FILE = "checkpoint.jsonl"
+
+
+def find_inputs(patterns, extensions, exclude=None):
+    """Sorted, de-duplicated files under the given directories, globs or paths with a matching extension.
+
+    Files under the exclude directory (the output directory, which may sit inside an input one) are
+    skipped, so a run never picks up the reports of an earlier one.
+    """
+    exclude = os.path.join(os.path.abspath(exclude), "") if exclude else None
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "**", "*")
+        for path in glob.glob(pattern, recursive=True):
+            path = os.path.abspath(path)
+            if os.path.isfile(path) and path.lower().endswith(extensions) and not (exclude and path.startswith(exclude)):
+                found.add(path)
+    return sorted(found)
+
+
+def load_checkpoint(path):
+    """{(mode, digest): entry} for files already processed successfully"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interrupted run
+            if entry.get("status") == "ok":
+                done[(entry["mode"], entry["digest"])] = entry
+    return done
+
+
+def write_reports(result, source, prefix, formats, author):
+    """Write the requested report formats for one pipeline result and return their paths"""
+    outputs = []
+    if "docx" in formats:
+        outputs.append(export_to_docx(f"{prefix}.docx", result["sections"], result["title"], author))
+    if "pdf" in formats:
+        outputs.append(export_to_pdf(f"{prefix}.pdf", result["sections"], result["title"], author))
+    if "json" in formats:
+        report = {
+            "source": source,
+            "title": result["title"],
+            "author": author,
+            "generated": datetime.now().isoformat(timespec="seconds"),
+            "sections": result["sections"],
+        }
+        if "stories" in result:
+            report["stories"] = result["stories"]
+        with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        outputs.append(f"{prefix}.json")
+    return outputs
+
+
+def process_file(mode, path, prefix, formats, author, use_cache, batch_id):
+    """Run one file through its pipeline and write its reports; safe to call in a worker process"""
+    started = time.perf_counter()
+    with tagged(batch=batch_id, app_mode=mode, file=path):
+        try:
+            with open(path, "rb") as f:
+                result = PIPELINES[mode](f, use_cache=use_cache)
+            outputs = write_reports(result, path, prefix, formats, author)
+            error = None
+        except Exception as e:
+            outputs, error = [], f"{type(e).__name__}: {e}"
+    totals = get_metrics_registry().summary(batch=batch_id, file=path)
+    return {
+        "status": "error" if error else "ok",
+        "error": error,
+        "outputs": outputs,
+        "seconds": round(time.perf_counter() - started, 3),
+        "tokens": totals.get("prompt_tokens", 0) + totals.get("completion_tokens", 0),
+        "cache_hits": totals.get("cache_hits", 0),
+        "cost": round(totals.get("cost", 0.0), 6),
+    }
+
+
+def _init_worker(workers):
+    """Give a worker process its share of the OpenAI rate limits"""
+    from utils.client_utils import share_rate_limit
+
+    share_rate_limit(workers)
+
+
+def output_prefixes(files, digests, out_dir, suffix):
+    """Report path prefix per file; files sharing a name get their content hash appended"""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in files]
+    prefixes = {}
+    for path, stem in zip(files, stems):
+        name = f"{stem}.{suffix}" if stems.count(stem) == 1 else f"{stem}.{digests[path][:8]}.{suffix}"
+        prefixes[path] = os.path.join(out_dir, name)
+    return prefixes
+
+
+def run_batch(mode, files, out_dir, formats=FORMATS, workers=MAX_WORKERS, executor="thread",
+              files_per_minute=None, resume=False, author="Analyst", use_cache=True):
+    """Process files with a bounded pool, optionally rate limited, checkpointing each finished file.
+
+    Returns the summary totals printed at the end of the run.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_FILE)
+    done = load_checkpoint(checkpoint_path) if resume else {}
+    digests = {}
+    for path in files:
+        with open(path, "rb") as f:
+            digests[path] = file_digest(f.read())
+    todo = [path for path in files if (mode, digests[path]) not in done]
+    skipped = len(files) - len(todo)
+    if skipped:
+        print(f"Skipping {skipped} file(s) already in {checkpoint_path}")
+    prefixes = output_prefixes(todo, digests, out_dir, mode)
+
+    batch_id = uuid.uuid4().hex
+    interval = 60.0 / files_per_minute if files_per_minute else 0.0
+    # Worker processes each have their own rate limiter, so each gets an equal share of the budgets
+    pool = (ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,))
+            if executor == "process" else ThreadPoolExecutor(max_workers=workers))
+    totals = {"files": 0, "failed": 0, "tokens": 0, "cache_hits": 0, "cost": 0.0}
+    started = time.perf_counter()
+    with pool, \
+            open(checkpoint_path, "a" if resume else "w", encoding="utf-8") as checkpoint:
+        queued, pending, next_start = list(todo), {}, time.monotonic()
+        while queued or pending:
+            # Submit as the rate limit allows, keeping at most two files per worker in flight
+            while queued and len(pending) < 2 * workers and time.monotonic() >= next_start:
+                path = queued.pop(0)
+                future = pool.submit(process_file, mode, path, prefixes[path], formats, author, use_cache, batch_id)
+                pending[future] = path
+                next_start = max(next_start, time.monotonic()) + interval
+            if not pending:
+                time.sleep(max(0.0, next_start - time.monotonic()))
+                continue
+            timeout = max(0.0, next_start - time.monotonic()) if queued and len(pending) < 2 * workers else None
+            finished, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = pending.pop(future)
+                entry = {"mode": mode, "file": path, "digest": digests[path], **future.result()}
+                checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+                totals["files"] += 1
+                totals["failed"] += entry["status"] != "ok"
+                for key in ("tokens", "cache_hits", "cost"):
+                    totals[key] += entry[key]
+                outcome = entry["error"] if entry["error"] else f"{entry['tokens']:,} tokens"
+                print(f"[{totals['files']}/{len(todo)}] {entry['status']:5} {entry['seconds']:7.1f}s  {path}  ({outcome})")
+    totals["seconds"] = time.perf_counter() - started
+    minutes = max(totals["seconds"], 1e-9) / 60
+    totals["files_per_minute"] = totals["files"] / minutes
+    totals["tokens_per_minute"] = totals["tokens"] / minutes
+    totals["skipped"] = skipped
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a GenAI portfolio app over many files without the UI")
+    parser.add_argument("mode", choices=sorted(PIPELINES), help="which app to run")
+    parser.add_argument("inputs", nargs="+", help="files, directories (searched recursively) or glob patterns")
+    parser.add_argument("--out", default="reports", help="directory for reports and the checkpoint (default: reports)")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated report formats: docx,pdf,json")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="files processed concurrently")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="pool type; processes help when local extraction, not the API, is the bottleneck")
+    parser.add_argument("--files-per-minute", type=float, help="start at most this many files per minute")
+    parser.add_argument("--resume", action="store_true", help="skip files already processed according to the checkpoint")
+    parser.add_argument("--author", default="Analyst", help="author shown on the reports")
+    parser.add_argument("--no-cache", action="store_true", help="force fresh OpenAI calls")
+    args = parser.parse_args(argv)
+
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+    files = find_inputs(args.inputs, EXTENSIONS[args.mode], exclude=args.out)
+    if not files:
+        parser.error(f"no {'/'.join(EXTENSIONS[args.mode])} files found")
+
+    totals = run_batch(args.mode, files, args.out, formats, max(1, args.workers), args.executor,
+                       args.files_per_minute, args.resume, args.author, not args.no_cache)
+    print(
+        f"\n{totals['files']} file(s) in {totals['seconds']:.1f}s ({totals['failed']} failed, {totals['skipped']} skipped) · "
+        f"{totals['files_per_minute']:.2f} files/min · {totals['tokens']:,} tokens ({totals['tokens_per_minute']:,.0f} tokens/min) · "
+        f"{totals['cache_hits']} cached calls · ${totals['cost']:.4f}"
+    )
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Synthetic, deterministic inputs for the benchmarks, returned as named in-memory uploads"""
+import io
+import random
+import wave
+
+import docx
+import pandas as pd
+from fpdf import FPDF
+
+WORDS = ("customer", "report", "deadline", "system", "shall", "provide", "data", "access", "within",
+         "days", "the", "of", "and", "compliance", "user", "export", "must", "review", "risk", "owner")
+# Accented, Greek and Cyrillic words, typographic punctuation and an emoji, for the Unicode PDF path
+MULTILINGUAL = ("Müller", "réunion", "Qualität", "déjà", "δεδομένα", "έλεγχος", "отчёт", "срок", "—", "“agreed”", "✅")
+COMPLAINTS = ("app crashes on login", "great support team", "checkout is too slow", "love the new design",
+              "billing page is confusing", "search never finds anything", "delivery was late again",
+              "price is fair for what you get", "cannot reset my password", "notifications are spammy")
+
+
+def upload(data, name):
+    """An in-memory binary file with a name, accepted wherever a Streamlit upload is"""
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def paragraph(rng, sentences=6):
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def pdf_upload(pages, seed=0, revised=()):
+    """PDF with `pages` pages of body text, one section per page; pages in revised get an extra obligation"""
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 11)
+    for number in range(pages):
+        pdf.add_page()
+        text = f"Section {number + 1}. " + paragraph(rng, 10)
+        if number in revised:
+            text += " Providers must report every incident within ten days."
+        pdf.multi_cell(0, 6, text)
+    return upload(pdf.output(dest="S").encode("latin-1"), f"synthetic_{pages}p.pdf")
+
+
+def docx_upload(paragraphs, seed=0):
+    """Word document with `paragraphs` paragraphs"""
+    rng = random.Random(seed)
+    document = docx.Document()
+    for number in range(paragraphs):
+        document.add_paragraph(f"REQ-{number + 1}: " + paragraph(rng, 3))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return upload(buffer.getvalue(), f"synthetic_{paragraphs}p.docx")
+
+
+def xlsx_upload(rows, seed=0):
+    """Excel workbook with one sheet of `rows` requirement rows"""
+    rng = random.Random(seed)
+    frame = pd.DataFrame({
+        "ID": [f"REQ-{i + 1}" for i in range(rows)],
+        "Requirement": [sentence(rng) for _ in range(rows)],
+        "Priority": [rng.choice(["High", "Medium", "Low"]) for _ in range(rows)],
+    })
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False, sheet_name="Requirements")
+    return upload(buffer.getvalue(), f"synthetic_{rows}r.xlsx")
+
+
+def transcript_text(size_bytes, seed=0):
+    """Timestamped meeting transcript of roughly size_bytes characters"""
+    rng = random.Random(seed)
+    lines, total, second = [], 0, 0
+    while total < size_bytes:
+        line = f"[{second // 3600:02d}:{second % 3600 // 60:02d}:{second % 60:02d}] {sentence(rng)}"
+        lines.append(line)
+        total += len(line) + 1
+        second += 5
+    return "\n".join(lines)[:size_bytes]
+
+
+def meeting_transcript(minutes, seed=0):
+    """Transcript of a meeting `minutes` long: a timestamped line every 5 seconds, in several scripts"""
+    rng = random.Random(seed)
+    lines = []
+    for second in range(0, minutes * 60, 5):
+        words = " ".join(rng.choice(WORDS + MULTILINGUAL) for _ in range(12))
+        lines.append(f"[{second // 3600:02d}:{second % 3600 // 60:02d}:{second % 60:02d}] {words.capitalize()}.")
+    return "\n".join(lines)
+
+
+def feedback_csv_upload(rows, seed=0):
+    """Feedback CSV of `rows` comments: mostly repeats and near-duplicates of a few complaints, as real exports are"""
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(rows):
+        comment = rng.choice(COMPLAINTS)
+        roll = rng.random()
+        if roll < 0.3:
+            comment = comment.capitalize() + rng.choice(["!", "!!", ".", " :("])
+        elif roll < 0.4:
+            comment = f"{comment}, order {rng.randrange(100000)}"
+        comments.append(comment)
+    data = pd.DataFrame({"id": range(rows), "feedback": comments}).to_csv(index=False).encode("utf-8")
+    return upload(data, f"synthetic_{rows}r.csv")
+
+
+def wav_upload(seconds, rate=16000):
+    """Silent 16 kHz mono WAV recording of the given length"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as target:
+        target.setnchannels(1)
+        target.setsampwidth(2)
+        target.setframerate(rate)
+        target.writeframes(b"\0\0" * rate * seconds)
+    return upload(buffer.getvalue(), f"synthetic_{seconds}s.wav")
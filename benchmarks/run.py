@@ -0,0 +1,263 @@
+"""Benchmarks for extraction, export, feedback preparation and the four app pipelines.
+
+Every measurement runs in a fresh interpreter with its own empty cache directory, so caches
+start cold and peak RSS belongs to that case alone. Model calls go to the stub backend with no
+latency, so the pipeline cases measure the app's own overhead. Examples:
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --cases extract_pdf,export_pdf --repeat 3
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.25
+
+--compare exits with status 1 when a case got slower or uses more memory than the baseline
+allows, so it can gate a deploy.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Differences below these are timer/allocator noise, whatever the relative change
+MIN_REGRESSION = {"seconds": 0.05, "peak_rss_mb": 5.0}
+# Seconds per unit a case may take, baseline or not: the Streamlit entry point's first run in a
+# fresh process (imports included) and each later rerun, and the PDF report per minute of meeting
+# transcript (so 1.2s for an hour-long meeting). Exceeding any of them fails the run.
+BUDGET_SECONDS = {"app_cold_start": 1.0, "app_rerun": 0.05, "export_pdf_meeting": 0.02}
+
+
+def _extract(make_upload):
+    def prepare(size):
+        from utils.file_utils import extract_text_from_file
+        uploaded = make_upload(size)
+        return lambda: extract_text_from_file(uploaded), size
+    return prepare
+
+
+def _export(fmt):
+    def prepare(size):
+        from benchmarks.fixtures import transcript_text
+        from utils.export_utils import export_to_docx, export_to_pdf
+        export = export_to_docx if fmt == "docx" else export_to_pdf
+        content = {"Summary": "Short summary of the meeting.", "Transcript": transcript_text(size)}
+        target = os.path.join(tempfile.mkdtemp(), f"report.{fmt}")
+        return lambda: export(target, content, "Benchmark Report"), size / 1_000_000
+    return prepare
+
+
+def _export_meeting(size):
+    from benchmarks.fixtures import meeting_transcript, paragraph
+    from utils.export_utils import export_to_pdf
+    rng = random.Random(0)
+    content = {
+        "📋 Meeting Summary": paragraph(rng),
+        "📝 Action Items": "\n".join(f"- {paragraph(rng, 1)}" for _ in range(5)),
+        "📄 Transcript": meeting_transcript(size),
+    }
+    target = os.path.join(tempfile.mkdtemp(), "meeting_report.pdf")
+    return lambda: export_to_pdf(target, content, "Meeting Report"), size
+
+
+def _prepare_feedback(size):
+    from benchmarks.fixtures import feedback_csv_upload
+    from utils.dedupe_utils import collapse_near_duplicates
+    from utils.feedback_utils import read_feedback
+    uploaded = feedback_csv_upload(size)
+    return lambda: collapse_near_duplicates(read_feedback(uploaded)), size
+
+
+def _pipeline(mode, make_upload):
+    def prepare(size):
+        from utils.pipelines import PIPELINES
+        # pipelines import their dependencies on first run; load them now so only the work is timed
+        for module in ("audio_utils", "dedupe_utils", "feedback_utils", "file_utils", "index_utils", "stories_utils",
+                       "summarize_utils"):
+            importlib.import_module(f"utils.{module}")
+        uploaded = make_upload(size)
+        return lambda: PIPELINES[mode](uploaded), size
+    return prepare
+
+
+def _regulatory_diff(size):
+    """Two versions of a `size`-page regulation that differ in one section"""
+    from benchmarks.fixtures import pdf_upload
+    from utils.pipelines import run_regulatory
+    for module in ("diff_utils", "file_utils", "index_utils", "summarize_utils"):
+        importlib.import_module(f"utils.{module}")
+    previous, current = pdf_upload(size), pdf_upload(size, revised={size // 2})
+    return lambda: run_regulatory(current, previous_file=previous), size
+
+
+def _app(rerun):
+    def prepare(size):
+        from streamlit.testing.v1 import AppTest
+        app = AppTest.from_file(os.path.join(ROOT, "genaiportfolio.py"), default_timeout=60)
+        if not rerun:
+            return app.run, 1
+        app.run()
+        return lambda: [app.run() for _ in range(size)], size
+    return prepare
+
+
+def _fixture(name):
+    def make(size):
+        from benchmarks import fixtures
+        return getattr(fixtures, name)(size)
+    return make
+
+
+# name -> (prepare(size) returning (run, work units), unit, full sizes, --quick sizes)
+CASES = {
+    "extract_pdf": (_extract(_fixture("pdf_upload")), "pages", [1, 100, 500, 2000], [1, 50]),
+    "extract_docx": (_extract(_fixture("docx_upload")), "paragraphs", [1, 100, 2000], [1, 100]),
+    "extract_xlsx": (_extract(_fixture("xlsx_upload")), "rows", [1, 100, 2000], [1, 100]),
+    "export_docx": (_export("docx"), "MB", [1_000, 100_000, 1_000_000, 5_000_000], [1_000, 100_000]),
+    "export_pdf": (_export("pdf"), "MB", [1_000, 100_000, 1_000_000, 5_000_000], [1_000, 100_000]),
+    "export_pdf_meeting": (_export_meeting, "transcript minutes", [60, 600, 3000], [60]),
+    "feedback_prepare": (_prepare_feedback, "rows", [100, 10_000, 100_000, 1_000_000], [100, 10_000]),
+    "pipeline_meeting": (_pipeline("meeting", _fixture("wav_upload")), "audio seconds", [60, 1800], [60]),
+    "pipeline_requirements": (_pipeline("requirements", _fixture("docx_upload")), "paragraphs", [10, 500], [10]),
+    "pipeline_feedback": (_pipeline("feedback", _fixture("feedback_csv_upload")), "rows", [100, 10_000], [100]),
+    "pipeline_regulatory": (_pipeline("regulatory", _fixture("pdf_upload")), "pages", [5, 200], [5]),
+    "pipeline_regulatory_diff": (_regulatory_diff, "pages", [5, 200], [5]),
+    "app_cold_start": (_app(rerun=False), "runs", [1], [1]),
+    "app_rerun": (_app(rerun=True), "reruns", [20], [20]),
+}
+
+
+def run_child(name, size):
+    """Measure one case once in this process and print the result as JSON"""
+    prepare, unit, _, _ = CASES[name]
+    run, units = prepare(size)
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak, "children_peak_rss_mb": children, "units": units}))
+
+
+def measure(name, size, repeat):
+    """Median wall time and worst peak RSS of `repeat` runs, each in a fresh interpreter"""
+    runs = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "GENAI_CACHE_DIR": tmp,
+                "GENAI_METRICS_FILE": os.path.join(tmp, "metrics.jsonl"),
+                "GENAI_BACKEND": "stub",
+                "GENAI_STUB_LATENCY": "0",
+                "GENAI_STUB_SECONDS_PER_TOKEN": "0",
+                "GENAI_STUB_ERROR_RATE": "0",
+            }
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--child", name, str(size)],
+                cwd=ROOT, env=env, capture_output=True, text=True,
+            )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{name}[{size}] failed:\n{completed.stderr}")
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    seconds = statistics.median(run["seconds"] for run in runs)
+    units = runs[0]["units"]
+    return {
+        "case": name,
+        "size": size,
+        "unit": CASES[name][1],
+        "seconds": round(seconds, 4),
+        "throughput": round(units / seconds, 3) if seconds else None,
+        "peak_rss_mb": round(max(run["peak_rss_mb"] for run in runs), 1),
+        "children_peak_rss_mb": round(max(run["children_peak_rss_mb"] for run in runs), 1),
+    }
+
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose time or peak RSS exceeds the baseline by more than tolerance (a fraction) and the noise floor"""
+    previous = {(entry["case"], entry["size"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["case"], entry["size"]))
+        if before is None:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            grew = entry[metric] - before[metric]
+            if grew > before[metric] * tolerance and grew > MIN_REGRESSION[metric]:
+                regressions.append(f"{entry['case']}[{entry['size']}] {metric}: {before[metric]} -> {entry[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark extraction, export and the app pipelines")
+    parser.add_argument("--cases", help=f"comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--quick", action="store_true", help="small sizes only, for a fast smoke run")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case and size; the median time is reported")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="store the results as the baseline to compare against")
+    parser.add_argument("--compare", metavar="FILE", help="fail when results regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/memory growth vs the baseline (default 0.25)")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child[0], int(args.child[1]))
+        return 0
+
+    names = [name.strip() for name in args.cases.split(",")] if args.cases else list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    results = []
+    print(f"{'case':24} {'size':>10} {'seconds':>10} {'throughput':>22} {'peak RSS':>10}")
+    for name in names:
+        _, unit, sizes, quick_sizes = CASES[name]
+        for size in quick_sizes if args.quick else sizes:
+            entry = measure(name, size, max(1, args.repeat))
+            results.append(entry)
+            throughput = f"{entry['throughput']:,.2f} {unit}/s" if entry["throughput"] is not None else "-"
+            print(f"{name:24} {size:>10,} {entry['seconds']:>10.3f} {throughput:>22} {entry['peak_rss_mb']:>8.0f}MB")
+
+    over_budget = [
+        f"{entry['case']}[{entry['size']}] {1 / entry['throughput']:.3f}s per {CASES[entry['case']][1][:-1]}"
+        f" (budget {BUDGET_SECONDS[entry['case']]}s)"
+        for entry in results
+        if entry["case"] in BUDGET_SECONDS and entry["throughput"] and 1 / entry["throughput"] > BUDGET_SECONDS[entry["case"]]
+    ]
+    for line in over_budget:
+        print(f"OVER BUDGET {line}")
+
+    report = {"environment": environment(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != report["environment"]:
+            print(f"Note: baseline was recorded on {baseline.get('environment')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""Helpers shared by the Streamlit app (genaiportfolio.py), the batch CLI (batch.py) and the benchmarks.
+
+Nothing is imported here: heavy dependencies (pandas, the OpenAI SDK, document libraries) load
+only with the module, or pipeline, that needs them.
+"""
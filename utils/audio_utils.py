@@ -0,0 +1,118 @@
+import contextvars
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.file_utils import read_upload_bytes
+from utils.llm_utils import transcribe_audio
+from utils.metrics_utils import tagged
+from utils.pipeline_utils import MAX_WORKERS
+
+SEGMENT_SECONDS = int(os.getenv("GENAI_AUDIO_SEGMENT_SECONDS", 600))
+OVERLAP_SECONDS = 5
+MAX_SEGMENT_BYTES = 24 * 1024 * 1024  # Whisper rejects uploads over 25 MB
+
+
+def _to_wav(data, name):
+    """Decode any audio format to 16 kHz mono WAV with ffmpeg, or None when ffmpeg is unavailable"""
+    if not shutil.which("ffmpeg"):
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "input" + os.path.splitext(name)[1])
+        target = os.path.join(tmp, "output.wav")
+        with open(source, "wb") as f:
+            f.write(data)
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", source, "-ac", "1", "-ar", "16000", target],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            return None
+        with open(target, "rb") as f:
+            return f.read()
+
+
+def split_audio(data, name, segment_seconds=SEGMENT_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+    """Split audio into overlapping WAV segments.
+
+    Returns a list of (offset_seconds, duration_seconds, (filename, bytes)). Audio that cannot be
+    decoded locally (compressed formats without ffmpeg) comes back as a single segment.
+    """
+    wav_data = _to_wav(data, name) or (data if name.lower().endswith(".wav") else None)
+    if wav_data is None:
+        return [(0.0, None, (name, data))]
+    with wave.open(io.BytesIO(wav_data)) as source:
+        params = source.getparams()
+        rate = params.framerate
+        bytes_per_second = rate * params.nchannels * params.sampwidth
+        segment_seconds = min(segment_seconds, MAX_SEGMENT_BYTES // bytes_per_second)
+        step = max(segment_seconds - overlap_seconds, 1) * rate
+        segments = []
+        for start in range(0, params.nframes, step):
+            source.setpos(start)
+            frames = source.readframes(segment_seconds * rate)
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as target:
+                target.setparams(params)
+                target.writeframes(frames)
+            duration = len(frames) / bytes_per_second
+            segments.append((start / rate, duration, (f"segment_{len(segments):04d}.wav", buffer.getvalue())))
+            if start + segment_seconds * rate >= params.nframes:
+                break
+    return segments
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def stitch_segments(results, overlap_seconds=OVERLAP_SECONDS):
+    """Merge per-segment (start, end, text) lists, shifted by each offset, dropping the overlap.
+
+    Each overlap is cut at its midpoint: a piece belongs to the segment on whose side of the cut
+    its own midpoint falls. A piece straddling the boundary is therefore kept once, and the words
+    cut off at the start of the next segment are dropped.
+    """
+    offsets = [offset for offset, _ in results]
+    lines = []
+    for i, (offset, pieces) in enumerate(results):
+        since = offset + overlap_seconds / 2 if i else float("-inf")
+        until = offsets[i + 1] + overlap_seconds / 2 if i + 1 < len(offsets) else float("inf")
+        for start, end, text in pieces:
+            start, end = start + offset, end + offset
+            if text and since <= (start + end) / 2 < until:
+                lines.append(f"[{format_timestamp(start)}] {text}")
+    return "\n".join(lines)
+
+
+def transcribe_long_audio(uploaded_file, on_partial=None, max_workers=MAX_WORKERS, use_cache=True):
+    """Transcribe a recording of any length as concurrently processed, overlapping segments.
+
+    Each segment's transcription is cached under its audio bytes, so transcribing the same
+    recording again makes no API calls unless use_cache is off. on_partial(text, done, total) is
+    called from the calling thread whenever the finished prefix of the recording grows, so the
+    transcript can be streamed into the UI in order.
+    """
+    segments = split_audio(read_upload_bytes(uploaded_file), uploaded_file.name)
+    results = [None] * len(segments)
+    emitted = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, tagged(step="segment"):
+        futures = {
+            pool.submit(contextvars.copy_context().run, transcribe_audio, file,
+                        audio_seconds=duration, timestamps=True, use_cache=use_cache): i
+            for i, (offset, duration, file) in enumerate(segments)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = (segments[futures[future]][0], future.result())
+            ready = emitted
+            while ready < len(results) and results[ready] is not None:
+                ready += 1
+            if on_partial and (ready > emitted or done == len(segments)):
+                on_partial(stitch_segments(results[:ready]), done, len(segments))
+            emitted = ready
+    return stitch_segments(results)
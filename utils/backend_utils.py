@@ -0,0 +1,213 @@
+import collections
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+from utils.cache_utils import process_wide
+from utils.client_utils import get_openai_client, get_rate_limiter, with_retries
+
+BACKEND = os.getenv("GENAI_BACKEND", "openai")
+
+# Stub behaviour, see StubBackend
+STUB_LATENCY = float(os.getenv("GENAI_STUB_LATENCY", 0.05))
+STUB_SECONDS_PER_TOKEN = float(os.getenv("GENAI_STUB_SECONDS_PER_TOKEN", 0.0))
+STUB_COMPLETION_TOKENS = int(os.getenv("GENAI_STUB_COMPLETION_TOKENS", 64))
+STUB_ERROR_RATE = float(os.getenv("GENAI_STUB_ERROR_RATE", 0.0))
+STUB_SEED = int(os.getenv("GENAI_STUB_SEED", 0))
+
+CHARS_PER_TOKEN = 4
+
+Completion = collections.namedtuple("Completion", "text prompt_tokens completion_tokens")
+Transcription = collections.namedtuple("Transcription", "text segments duration")
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class OpenAIBackend:
+    """Chat and transcription calls against the OpenAI API, rate limited and retried (see client_utils)"""
+
+    name = "openai"
+
+    @staticmethod
+    @with_retries
+    def _create_completion(budget, **kwargs):
+        # every attempt takes the estimate; a failed one gives it back, the caller settles the one that ran
+        limiter = get_rate_limiter()
+        limiter.acquire(budget)
+        try:
+            return get_openai_client().chat.completions.create(**kwargs)
+        except Exception:
+            limiter.settle(budget, 0)
+            raise
+
+    @staticmethod
+    @with_retries
+    def _create_transcription(**kwargs):
+        get_rate_limiter().acquire()
+        return get_openai_client().audio.transcriptions.create(**kwargs)
+
+    @staticmethod
+    def _messages(prompt, system_prompt):
+        return [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}]
+
+    def complete(self, prompt, model, system_prompt, max_tokens, json_schema=None):
+        """The full reply as a Completion; with json_schema, the reply is a JSON object following it"""
+        budget = estimate_tokens(system_prompt + prompt) + max_tokens
+        extra = {}
+        if json_schema is not None:
+            extra["response_format"] = {"type": "json_schema",
+                                        "json_schema": {"name": json_schema.get("title", "reply"), "schema": json_schema}}
+        response = self._create_completion(budget, model=model, messages=self._messages(prompt, system_prompt),
+                                           max_tokens=max_tokens, **extra)
+        get_rate_limiter().settle(budget, response.usage.total_tokens)
+        return Completion((response.choices[0].message.content or "").strip(),
+                          response.usage.prompt_tokens, response.usage.completion_tokens)
+
+    def stream(self, prompt, model, system_prompt, max_tokens):
+        """Yield the reply as text pieces, then one Completion carrying the usage"""
+        budget = estimate_tokens(system_prompt + prompt) + max_tokens
+        parts, usage = [], None
+        response = self._create_completion(budget, model=model, messages=self._messages(prompt, system_prompt),
+                                           max_tokens=max_tokens, stream=True, stream_options={"include_usage": True})
+        try:
+            with response:
+                for chunk in response:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        finally:
+            get_rate_limiter().settle(budget, usage.total_tokens if usage else 0)
+        prompt_tokens = usage.prompt_tokens if usage else estimate_tokens(system_prompt + prompt)
+        completion_tokens = usage.completion_tokens if usage else len(parts)
+        yield Completion("".join(parts).strip(), prompt_tokens, completion_tokens)
+
+    def transcribe(self, file, model, timestamps=False, audio_seconds=None):
+        """Transcription with (start, end, text) segments when timestamps is set"""
+        transcript = self._create_transcription(
+            model=model,
+            file=file,
+            response_format="verbose_json" if timestamps else "json",
+        )
+        segments = [(seg.start, seg.end, seg.text.strip()) for seg in transcript.segments or []] if timestamps else []
+        return Transcription(transcript.text, segments, getattr(transcript, "duration", None))
+
+
+class StubBackendError(RuntimeError):
+    """A failure injected by the stub backend"""
+
+
+class StubBackend:
+    """Offline backend with deterministic replies, for load tests, profiling and CI without API keys.
+
+    Replies are derived from a hash of the request, so the same input always gives the same output;
+    requests with a JSON schema get a JSON object of that shape, filled with the same kind of text
+    and with one map entry per numbered line of the prompt.
+    Each call sleeps `latency` seconds plus `seconds_per_token` per completion token (streamed
+    replies are paced token by token), reports `completion_tokens` tokens (capped by max_tokens),
+    and fails with StubBackendError for a deterministic `error_rate` fraction of requests.
+    """
+
+    name = "stub"
+
+    WORDS = ("the", "team", "agreed", "review", "customer", "release", "risk", "update", "compliance",
+             "deadline", "owner", "budget", "scope", "data", "report", "process", "impact", "action")
+
+    def __init__(self, latency=STUB_LATENCY, seconds_per_token=STUB_SECONDS_PER_TOKEN,
+                 completion_tokens=STUB_COMPLETION_TOKENS, error_rate=STUB_ERROR_RATE, seed=STUB_SEED):
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.seed = seed
+
+    def _rng(self, *parts):
+        digest = hashlib.sha256(repr((self.seed,) + parts).encode("utf-8")).digest()
+        return random.Random(digest)
+
+    def _reply(self, rng, tokens):
+        words = [rng.choice(self.WORDS) for _ in range(tokens)]
+        return " ".join(words).capitalize() + "."
+
+    def _instance(self, rng, schema, tokens, keys=(), defs=None):
+        """A value matching a (pydantic-generated) JSON schema: strings, lists, enums, objects and maps.
+
+        A map (an object with additionalProperties) gets an entry per key in keys, the numbers of
+        the items listed in the prompt.
+        """
+        defs = schema.get("$defs", {}) if defs is None else defs
+        if "$ref" in schema:
+            schema = defs[schema["$ref"].rsplit("/", 1)[-1]]
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        kind = schema.get("type")
+        if kind == "object" and isinstance(schema.get("additionalProperties"), dict):
+            return {key: self._instance(rng, schema["additionalProperties"], max(1, tokens // max(len(keys), 1)), defs=defs)
+                    for key in keys}
+        if kind == "object":
+            return {name: self._instance(rng, field, tokens, keys, defs) for name, field in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._instance(rng, schema.get("items", {}), max(1, tokens // 3), defs=defs) for _ in range(3)]
+        if kind in ("integer", "number"):
+            return rng.randint(1, 10)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        return self._reply(rng, tokens)
+
+    def _maybe_fail(self, rng):
+        if rng.random() < self.error_rate:
+            time.sleep(self.latency)
+            raise StubBackendError("Injected stub backend failure")
+
+    def _pieces(self, prompt, model, system_prompt, max_tokens, json_schema=None):
+        rng = self._rng(model, system_prompt, prompt, max_tokens)
+        self._maybe_fail(rng)
+        tokens = max(1, min(self.completion_tokens, max_tokens))
+        if json_schema is not None:
+            keys = re.findall(r"^(\d+)\. ", prompt, re.MULTILINE)
+            return rng, tokens, json.dumps(self._instance(rng, json_schema, tokens, keys))
+        return rng, tokens, self._reply(rng, tokens)
+
+    def complete(self, prompt, model, system_prompt, max_tokens, json_schema=None):
+        rng, tokens, text = self._pieces(prompt, model, system_prompt, max_tokens, json_schema)
+        time.sleep(self.latency + self.seconds_per_token * tokens)
+        return Completion(text, estimate_tokens(system_prompt + prompt), tokens)
+
+    def stream(self, prompt, model, system_prompt, max_tokens):
+        rng, tokens, text = self._pieces(prompt, model, system_prompt, max_tokens)
+        time.sleep(self.latency)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.seconds_per_token * tokens / len(words))
+            yield word if i == 0 else " " + word
+        yield Completion(text, estimate_tokens(system_prompt + prompt), tokens)
+
+    def transcribe(self, file, model, timestamps=False, audio_seconds=None):
+        data = file[1] if isinstance(file, tuple) else file.getvalue() if hasattr(file, "getvalue") else file.read()
+        rng = self._rng(model, hashlib.sha256(data).hexdigest())
+        self._maybe_fail(rng)
+        duration = audio_seconds if audio_seconds is not None else 60.0
+        segments = []
+        for start in range(0, max(1, int(duration)), 5):
+            segments.append((float(start), float(min(start + 5, duration)), self._reply(rng, 8)))
+        time.sleep(self.latency + self.seconds_per_token * 8 * len(segments))
+        return Transcription(" ".join(text for _, _, text in segments), segments, duration)
+
+
+BACKENDS = {"openai": OpenAIBackend, "stub": StubBackend}
+
+
+@process_wide
+def get_backend():
+    """The backend chosen by GENAI_BACKEND ("openai" or "stub")"""
+    if BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown GENAI_BACKEND {BACKEND!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[BACKEND]()
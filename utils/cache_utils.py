@@ -0,0 +1,129 @@
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("GENAI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "genaiapps"))
+CACHE_MAX_BYTES = int(os.getenv("GENAI_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+CACHE_TTL_SECONDS = int(os.getenv("GENAI_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_DISABLED = os.getenv("GENAI_CACHE_DISABLE", "").lower() in ("1", "true", "yes")
+
+
+def process_wide(factory):
+    """Decorator for a zero-argument factory: every call returns the one object it builds in this process.
+
+    This is functools.cache with the first call made under a lock, so concurrent Streamlit sessions
+    and worker threads never build two instances.
+    """
+    cached = functools.cache(factory)
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        with lock:
+            return cached()
+
+    get.cache_clear = cached.cache_clear
+    return get
+
+
+def make_key(*parts):
+    """Content hash for a cache entry, e.g. (model, system prompt, user prompt, max_tokens)"""
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache for LLM responses with size and TTL eviction"""
+
+    def __init__(self, path, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS, enabled=not CACHE_DISABLED):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def set(self, key, value):
+        """Store value under key, then evict expired and least recently used entries"""
+        if not self.enabled:
+            return
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+                stale = []
+                for old_key, old_size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((old_key,))
+                    total -= old_size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        """Drop every cached entry and reset the counters"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Hit/miss counters plus current entry count and size on disk"""
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+@process_wide
+def get_response_cache():
+    """The model response cache under CACHE_DIR"""
+    return ResponseCache(os.path.join(CACHE_DIR, "responses.sqlite3"))
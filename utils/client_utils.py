@@ -0,0 +1,164 @@
+import email.utils
+import os
+import threading
+import time
+
+import httpx
+import openai
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from utils.cache_utils import process_wide
+
+REQUESTS_PER_MINUTE = int(os.getenv("GENAI_OPENAI_RPM", 500))
+TOKENS_PER_MINUTE = int(os.getenv("GENAI_OPENAI_TPM", 200_000))
+MAX_ATTEMPTS = int(os.getenv("GENAI_OPENAI_MAX_ATTEMPTS", 6))
+MAX_CONNECTIONS = int(os.getenv("GENAI_OPENAI_MAX_CONNECTIONS", 20))
+REQUEST_TIMEOUT = float(os.getenv("GENAI_OPENAI_TIMEOUT", 120))
+MAX_BACKOFF_SECONDS = 60
+
+# Failures worth retrying: rate limits, timeouts, dropped connections and server-side errors
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity per minute.
+
+    take() blocks until the requested amount is available; a request larger than the whole bucket
+    is capped at its capacity so it can still run once the bucket is full.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount):
+        amount = min(float(amount), self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return
+                wait = (amount - self.level) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def adjust(self, amount):
+        """Give back (positive) or charge (negative) tokens once the real usage is known"""
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, seconds):
+        """Empty the bucket so no new work starts for about `seconds`, e.g. after a 429"""
+        with self._lock:
+            self._refill()
+            self.level = min(self.level, -seconds * self.rate)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min budgets shared by every call made in this process"""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens=0):
+        """Block until one request and an estimated number of tokens fit in the budgets"""
+        self.requests.take(1)
+        if tokens:
+            self.tokens.take(tokens)
+
+    def settle(self, estimated, actual):
+        """Correct the token budget once the real usage of a call is known"""
+        self.tokens.adjust(estimated - actual)
+
+    def back_off(self, seconds):
+        """Pause new requests after the API reported a rate limit"""
+        self.requests.drain(seconds)
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait before retrying, if it said so"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def _wait(retry_state):
+    """Randomized exponential backoff, never shorter than the server's Retry-After"""
+    backoff = wait_random_exponential(multiplier=1, max=MAX_BACKOFF_SECONDS)(retry_state)
+    error = retry_state.outcome.exception()
+    requested = retry_after(error)
+    if isinstance(error, openai.RateLimitError):
+        get_rate_limiter().back_off(requested or backoff)
+    return max(backoff, requested or 0.0)
+
+
+with_retries = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=_wait,
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    reraise=True,
+)
+
+
+@process_wide
+def get_openai_client():
+    """Process-wide OpenAI client whose pooled httpx transport keeps connections alive across calls.
+
+    The SDK's own retries are disabled; calls are retried by with_retries so backoff is shared
+    with the rate limiter.
+    """
+    return openai.OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        max_retries=0,
+        timeout=REQUEST_TIMEOUT,
+        http_client=openai.DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+            timeout=REQUEST_TIMEOUT,
+        ),
+    )
+
+
+@process_wide
+def get_rate_limiter():
+    """The rate limiter every model call in this process goes through"""
+    return RateLimiter()
+
+
+def share_rate_limit(processes):
+    """Limit this process to an equal share of the RPM/TPM budgets split across `processes` processes.
+
+    Each process has its own RateLimiter, so worker processes that together should stay within the
+    account's limits (batch.py --executor process) call this before their first model call.
+    """
+    limiter = get_rate_limiter()
+    limiter.requests = TokenBucket(REQUESTS_PER_MINUTE / processes)
+    limiter.tokens = TokenBucket(TOKENS_PER_MINUTE / processes)
@@ -0,0 +1,95 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+SEED = 7
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text, k=SHINGLE_SIZE):
+    """Character k-gram hashes of a lowercased, punctuation-free comment"""
+    text = " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+    if len(text) <= k:
+        return np.array([zlib.crc32(text.encode("utf-8"))], dtype=np.uint64)
+    return np.unique(np.fromiter(
+        (zlib.crc32(text[i:i + k].encode("utf-8")) for i in range(len(text) - k + 1)),
+        dtype=np.uint64,
+    ))
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=SEED):
+    """MinHash signature matrix (len(texts) x num_perm) using universal hashing over shingle hashes.
+
+    Each permutation is (a * x + b) mod 2^61 - 1 on a 32-bit shingle hash x. a and b are drawn below
+    2^32, so a * x + b stays below 2^64 and is computed exactly in uint64.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64, endpoint=True)
+    b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64, endpoint=True)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashed = (np.outer(shingles(text), a) + b) % _MERSENNE_PRIME & _MAX_HASH
+        signatures[row] = hashed.min(axis=0)
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_near_duplicates(texts, bands=BANDS, num_perm=NUM_PERM, threshold=0.5):
+    """Cluster id per text; texts whose estimated Jaccard similarity passes threshold share a cluster.
+
+    Candidate pairs come from LSH banding (texts that agree on every row of some band) and are
+    confirmed against the full signatures of both texts and of their current cluster roots.
+    """
+    n = len(texts)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    parent = np.arange(n)
+    for band in range(bands):
+        band_view = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = band_view.view(np.dtype((np.void, band_view.dtype.itemsize * rows))).ravel()
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.concatenate(([0], np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1))
+        ends = np.append(starts[1:], n)
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            bucket = order[start:end]
+            head = bucket[0]
+            similarity = (signatures[bucket[1:]] == signatures[head]).mean(axis=1)
+            for other in bucket[1:][similarity >= threshold]:
+                root_a, root_b = _find(parent, head), _find(parent, other)
+                # compare cluster roots too, so chains of small edits cannot drift into one cluster
+                if root_a != root_b and (signatures[root_a] == signatures[root_b]).mean() >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
+
+
+def collapse_near_duplicates(frame, column="feedback", threshold=0.5):
+    """Collapse near-identical comments into one representative row per cluster.
+
+    frame has the comment column and a count column (see feedback_utils.read_feedback). The most
+    frequent comment of each cluster is kept, its count becomes the cluster total, and
+    cluster_size records how many distinct comments were merged into it.
+    """
+    if frame.empty:
+        return frame.assign(cluster_size=pd.Series(dtype="int64"))
+    frame = frame.reset_index(drop=True)
+    clusters = cluster_near_duplicates(frame[column].tolist(), threshold=threshold)
+    grouped = frame.assign(cluster=clusters).groupby("cluster", sort=False)
+    representatives = frame.loc[grouped["count"].idxmax(), [column]].reset_index(drop=True)
+    representatives["count"] = grouped["count"].sum().to_numpy()
+    representatives["cluster_size"] = grouped.size().to_numpy()
+    return representatives.sort_values("count", ascending=False, kind="stable").reset_index(drop=True)
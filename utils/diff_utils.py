@@ -0,0 +1,175 @@
+import collections
+import difflib
+import hashlib
+import re
+
+# Unchanged sentences kept around each edit inside a modified section
+CONTEXT_SENTENCES = 1
+# A line repeated on at least this share of pages is a running header/footer, not content
+RUNNING_LINE_SHARE = 0.5
+MAX_HEADING_WORDS = 12
+
+# "Article 5", "SECTION 12a", "Chapter IV", "Annex II", "§ 4.2" / "3.2 Reporting obligations" / "DEFINITIONS"
+KEYWORD_HEADING = re.compile(
+    r"^(?P<kind>article|section|chapter|part|title|annex|schedule|appendix|rule|regulation|§)\s*"
+    r"(?P<number>[0-9]+(?:\.[0-9]+)*[a-z]?|[IVXLC]+)\b[.:)]?\s*(?P<title>.*)$",
+    re.IGNORECASE,
+)
+NUMBERED_HEADING = re.compile(r"^(?P<number>\d+(?:\.\d+)*)\.?\s+(?P<title>[A-Z].*)$")
+PAGE_NUMBER = re.compile(r"^(?:page\s+)?\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.;:!?])\s+")
+
+Section = collections.namedtuple("Section", "key heading text hash")
+Change = collections.namedtuple("Change", "kind key heading old new")
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def section_hash(text):
+    """Fingerprint of a section's content; reflowed lines and page breaks do not change it"""
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+
+def _content_lines(pages):
+    """Lines of all pages without page numbers and running headers/footers"""
+    page_lines = [[_normalize(line) for line in page.splitlines()] for page in pages]
+    counts = collections.Counter(line for lines in page_lines for line in set(lines) if line)
+    running = {line for line, count in counts.items() if len(pages) >= 3 and count >= RUNNING_LINE_SHARE * len(pages)}
+    return [line for lines in page_lines for line in lines
+            if line and line not in running and not PAGE_NUMBER.match(line)]
+
+
+def _heading(line, following, parent):
+    """(key, heading, is top level) when the line starts a section, else None.
+
+    Numbered headings are keyed under the enclosing Article/Section heading, if any, so "1" in
+    Article 4 and "1" in Article 5 stay distinct. A numbered line followed by a lowercase line is
+    a clause wrapped by the PDF layout, not a heading.
+    """
+    match = KEYWORD_HEADING.match(line)
+    if match:
+        kind = "§" if match.group("kind") == "§" else match.group("kind").lower()
+        heading = line if len(line.split()) <= MAX_HEADING_WORDS else line.split(".")[0]
+        return f"{kind} {match.group('number').upper()}", heading, True
+    match = NUMBERED_HEADING.match(line)
+    if (match and len(line.split()) <= MAX_HEADING_WORDS and not line.endswith((".", ";", ","))
+            and not following[:1].islower()):
+        return f"{parent} {match.group('number')}" if parent else match.group("number"), line, False
+    if line.isupper() and len(line.split()) <= MAX_HEADING_WORDS and any(c.isalpha() for c in line):
+        return line.lower(), line, True
+    return None
+
+
+def split_sections(pages):
+    """Split a regulation's pages into Sections at headings and clause numbering, in document order.
+
+    Article/Section/Chapter/§ headings, numbered headings ("3.2 Reporting obligations") and
+    all-caps titles start a section; text before the first heading is the "preamble". Each section
+    is keyed by its number (or title) so the same section can be found in another version.
+    """
+    sections, key, heading, lines, parent = [], "preamble", "Preamble", [], None
+    seen = collections.Counter()
+
+    def flush():
+        if lines or key != "preamble":
+            seen[key] += 1
+            unique = key if seen[key] == 1 else f"{key}#{seen[key]}"
+            text = "\n".join(lines)
+            sections.append(Section(unique, heading, text, section_hash(f"{heading}\n{text}")))
+
+    content = _content_lines(pages)
+    for i, line in enumerate(content):
+        found = _heading(line, content[i + 1] if i + 1 < len(content) else "", parent)
+        if found:
+            flush()
+            key, heading, top_level = found
+            parent = key if top_level else parent
+            lines = [] if heading == line else [line]
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def diff_sections(previous, current):
+    """Added, removed and modified sections between two versions, in the current version's order.
+
+    Sections are matched by key; unmatched sections with identical text under a new number are
+    reported as "renumbered". Unchanged sections are left out. Removed sections
+    are placed after the section that preceded them in the previous version.
+    """
+    old_by_key = {section.key: section for section in previous}
+    new_keys = {section.key for section in current}
+    added = [section for section in current if section.key not in old_by_key]
+    removed = [section for section in previous if section.key not in new_keys]
+    removed_by_hash = {section_hash(section.text): section for section in removed if section.text}
+
+    renumbered = {}
+    for section in added:
+        match = removed_by_hash.pop(section_hash(section.text), None) if section.text else None
+        if match is not None:
+            renumbered[section.key] = match
+    still_removed = {section.key for section in removed} - {section.key for section in renumbered.values()}
+
+    # removed sections follow the closest preceding section that is still present
+    after = collections.defaultdict(list)
+    anchor = None
+    for section in previous:
+        if section.key in still_removed:
+            after[anchor].append(section)
+        elif section.key in new_keys:
+            anchor = section.key
+
+    changes = [Change("removed", s.key, s.heading, s.text, None) for s in after[None]]
+    for section in current:
+        old = old_by_key.get(section.key)
+        if section.key in renumbered:
+            moved = renumbered[section.key]
+            changes.append(Change("renumbered", section.key, f"{moved.heading} → {section.heading}", moved.text, section.text))
+        elif old is None:
+            changes.append(Change("added", section.key, section.heading, None, section.text))
+        elif old.hash != section.hash:
+            changes.append(Change("modified", section.key, section.heading, old.text, section.text))
+        changes.extend(Change("removed", s.key, s.heading, s.text, None) for s in after[section.key])
+    return changes
+
+
+def _sentences(text):
+    return [sentence for sentence in SENTENCE_END.split(_normalize(text)) if sentence]
+
+
+def change_excerpt(change):
+    """The text sent to the model for one change: the section heading and only what changed.
+
+    Modified sections keep CONTEXT_SENTENCES unchanged sentences around each edit; added and
+    removed sections are given in full. Renumbered sections carry no content change.
+    """
+    if change.kind == "added":
+        return f"ADDED SECTION: {change.heading}\n{_normalize(change.new)}"
+    if change.kind == "removed":
+        return f"REMOVED SECTION: {change.heading}\n{_normalize(change.old)}"
+    if change.kind == "renumbered":
+        return f"RENUMBERED SECTION (text unchanged): {change.heading}"
+    old, new = _sentences(change.old), _sentences(change.new)
+    parts = [f"MODIFIED SECTION: {change.heading}"]
+    for group in difflib.SequenceMatcher(None, old, new, autojunk=False).get_grouped_opcodes(CONTEXT_SENTENCES):
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                parts.append("Unchanged: " + " ".join(new[j1:j2]))
+                continue
+            if i2 > i1:
+                parts.append("Previous: " + " ".join(old[i1:i2]))
+            if j2 > j1:
+                parts.append("Current: " + " ".join(new[j1:j2]))
+    return "\n".join(parts)
+
+
+def changes_markdown(changes, unchanged):
+    """Local overview of the changes, built without any model call"""
+    counts = collections.Counter(change.kind for change in changes)
+    totals = ", ".join(f"{counts[kind]} {kind}" for kind in ("modified", "added", "removed", "renumbered") if counts[kind])
+    lines = [f"{totals or 'No changes'}; {unchanged} section(s) unchanged."]
+    lines += [f"- **{change.kind.capitalize()}**: {change.heading}" for change in changes]
+    return "\n".join(lines)
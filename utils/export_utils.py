@@ -1,9 +1,44 @@
-from docx import Document
-from docx.shared import Pt
-from fpdf import FPDF
+import collections
+import hashlib
+import io
+import json
+import threading
 from datetime import datetime
 
-def export_to_docx(filename, content_dict, title="Report", author="Analyst"):
+from utils.trace_utils import span
+
+RENDER_CACHE_SIZE = 32
+
+_rendered = collections.OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def report_digest(content_dict, title="Report", author="Analyst"):
+    """Content hash identifying a rendered report"""
+    payload = json.dumps([title, author, list(content_dict.items())], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _memoized(fmt, render, content_dict, title, author):
+    key = (fmt, report_digest(content_dict, title, author))
+    with _rendered_lock:
+        if key in _rendered:
+            _rendered.move_to_end(key)
+            return _rendered[key]
+    with span(f"export {fmt}", chars=sum(len(str(text)) for text in content_dict.values())) as current:
+        data = render(content_dict, title, author)
+        current.set(bytes=len(data))
+    with _rendered_lock:
+        _rendered[key] = data
+        while len(_rendered) > RENDER_CACHE_SIZE:
+            _rendered.popitem(last=False)
+    return data
+
+
+def _render_docx(content_dict, title, author):
+    from docx import Document
+    from docx.shared import Pt
+
     doc = Document()
     doc.add_heading(title, 0)
     doc.add_paragraph(f"Author: {author}")
@@ -16,26 +51,50 @@ def export_to_docx(filename, content_dict, title="Report", author="Analyst"):
         p.style.font.size = Pt(11)
         doc.add_paragraph("\n")
 
-    doc.save(filename)
-    return filename
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
 
 
-def export_to_pdf(filename, content_dict, title="Report", author="Analyst"):
-    pdf = FPDF()
+def _render_pdf(content_dict, title, author):
+    from utils.pdf_utils import ReportPDF, unicode_fonts
+
+    pdf = ReportPDF(unicode_fonts())
     pdf.add_page()
-    pdf.set_font("Arial", 'B', 20)
-    pdf.cell(0, 10, title, ln=True, align="C")
-    pdf.set_font("Arial", '', 12)
-    pdf.cell(0, 10, f"Author: {author}", ln=True, align="C")
-    pdf.cell(0, 10, f"Date: {datetime.today().strftime('%Y-%m-%d')}", ln=True, align="C")
+    pdf.use_font('B', 20)
+    pdf.text_block(title, 10, align="C")
+    pdf.use_font('', 12)
+    pdf.text_block(f"Author: {author}", 10, align="C")
+    pdf.text_block(f"Date: {datetime.today().strftime('%Y-%m-%d')}", 10, align="C")
     pdf.add_page()
 
     for section_title, section_body in content_dict.items():
-        pdf.set_font("Arial", 'B', 14)
-        pdf.multi_cell(0, 10, section_title)
-        pdf.set_font("Arial", '', 12)
-        pdf.multi_cell(0, 10, section_body)
+        pdf.use_font('B', 14)
+        pdf.text_block(section_title, 10)
+        pdf.use_font('', 12)
+        pdf.text_block(section_body, 10)
         pdf.ln(5)
 
-    pdf.output(filename)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def docx_bytes(content_dict, title="Report", author="Analyst"):
+    """Word report rendered in memory, memoized per report content hash"""
+    return _memoized("docx", _render_docx, content_dict, title, author)
+
+
+def pdf_bytes(content_dict, title="Report", author="Analyst"):
+    """PDF report rendered in memory, memoized per report content hash"""
+    return _memoized("pdf", _render_pdf, content_dict, title, author)
+
+
+def export_to_docx(filename, content_dict, title="Report", author="Analyst"):
+    with open(filename, "wb") as f:
+        f.write(docx_bytes(content_dict, title, author))
+    return filename
+
+
+def export_to_pdf(filename, content_dict, title="Report", author="Analyst"):
+    with open(filename, "wb") as f:
+        f.write(pdf_bytes(content_dict, title, author))
     return filename
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from utils.metrics_utils import tagged
+from utils.pipeline_utils import MAX_WORKERS, map_in_context
+from utils.structured_utils import FeedbackBatch, FeedbackSentiments, request_sections
+
+SENTIMENTS = ["Positive", "Neutral", "Negative"]
+UNKNOWN = "Unknown"
+BATCH_SIZE = 50
+MAX_COMMENT_CHARS = 500
+TOKENS_PER_LABEL = 8
+THEME_TOKENS = 120
+CSV_BLOCK_BYTES = 16 * 1024 * 1024
+
+CLASSIFY_PROMPT = "Classify the sentiment of each numbered customer comment as Positive, Neutral or Negative."
+CLASSIFY_THEMES_PROMPT = (
+    "Classify the sentiment of each numbered customer comment as Positive, Neutral or Negative, "
+    "and note the themes that recur across the comments. A comment marked [Nx] was received N times."
+)
+
+
+def normalize_feedback(series):
+    """Trim and collapse whitespace so trivially different copies of a comment match exactly"""
+    return series.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def read_feedback(uploaded_csv, column="feedback"):
+    """Stream only the feedback column of a CSV and collapse exact duplicates.
+
+    Returns a DataFrame of unique comments with a count column, most frequent first. Rows with the
+    wrong number of fields are skipped; how many is kept in frame.attrs["skipped_rows"]. Raises
+    ValueError when the header has no such column or the file cannot be parsed as CSV.
+    """
+    if hasattr(uploaded_csv, "seek"):
+        uploaded_csv.seek(0)
+    skipped = []
+    try:
+        reader = pacsv.open_csv(
+            uploaded_csv,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+            parse_options=pacsv.ParseOptions(invalid_row_handler=lambda row: skipped.append(row.number) or "skip"),
+            convert_options=pacsv.ConvertOptions(include_columns=[column], column_types={column: pa.string()}),
+        )
+        parts = []
+        for batch in reader:
+            texts = normalize_feedback(batch.column(0).to_pandas().dropna())
+            parts.append(texts[texts != ""].value_counts())
+    except KeyError as e:  # pyarrow's ArrowKeyError: the header has no such column
+        raise ValueError(f"CSV must contain a '{column}' column") from e
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Could not read the CSV: {e}") from e
+    if not parts:
+        frame = pd.DataFrame({column: pd.Series(dtype=str), "count": pd.Series(dtype="int64")})
+    else:
+        counts = pd.concat(parts).groupby(level=0).sum().sort_values(ascending=False, kind="stable")
+        frame = counts.rename_axis(column).rename("count").reset_index()
+    frame.attrs["skipped_rows"] = len(skipped)
+    return frame
+
+
+def weighted_lines(frame, column="feedback"):
+    """One line per unique comment, prefixed with how many times it was received"""
+    return "\n".join(f"[{count}x] {text}" for text, count in zip(frame[column], frame["count"]))
+
+
+def _labels(values, size):
+    """Labels for a batch of size comments from validated sentiments; missing or invalid ones are Unknown"""
+    sentiments = values.get("sentiments", {})
+    return [sentiments.get(str(i)) or UNKNOWN for i in range(1, size + 1)]
+
+
+def _classify_batch(batch, use_cache=True):
+    """Labels for a batch of comments from one structured call"""
+    lines = "\n".join(
+        f"{i}. {' '.join(text.split())[:MAX_COMMENT_CHARS]}" for i, text in enumerate(batch, 1)
+    )
+    values, _ = request_sections(f"{CLASSIFY_PROMPT}\n\n{lines}", FeedbackSentiments,
+                                 max_tokens=TOKENS_PER_LABEL * len(batch) + 20, use_cache=use_cache)
+    return _labels(values, len(batch))
+
+
+def classify_sentiment(texts, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS, use_cache=True):
+    """Label every comment Positive/Neutral/Negative, N comments per prompt with bounded parallelism"""
+    texts = list(texts)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, tagged(step="classify"):
+        results = map_in_context(pool, lambda batch: _classify_batch(batch, use_cache), batches)
+    return [label for labels in results for label in labels]
+
+
+def _classify_batch_with_themes(batch, use_cache=True):
+    """(labels, themes) for a batch of (comment, count) pairs from one structured call"""
+    lines = "\n".join(
+        f"{i}. [{count}x] {' '.join(text.split())[:MAX_COMMENT_CHARS]}" for i, (text, count) in enumerate(batch, 1)
+    )
+    values, _ = request_sections(f"{CLASSIFY_THEMES_PROMPT}\n\n{lines}", FeedbackBatch,
+                                 max_tokens=TOKENS_PER_LABEL * len(batch) + THEME_TOKENS, use_cache=use_cache)
+    return _labels(values, len(batch)), values.get("themes", [])
+
+
+def classify_with_themes(texts, counts, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS, use_cache=True):
+    """Sentiment labels as classify_sentiment, plus the recurring themes of each batch, in one call per batch.
+
+    Each comment is sent to the model once for both tasks; merging the per-batch themes (see
+    theme_notes) only needs the short theme lists. Returns (labels, themes of each batch).
+    """
+    pairs = list(zip(texts, counts))
+    batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, tagged(step="classify"):
+        results = map_in_context(pool, lambda batch: _classify_batch_with_themes(batch, use_cache), batches)
+    return [label for labels, _ in results for label in labels], [themes for _, themes in results]
+
+
+def theme_notes(batch_themes):
+    """Per-batch theme lists as text: a plain bullet list for a single batch, numbered parts otherwise"""
+    bullets = ["\n".join(f"- {theme}" for theme in themes) for themes in batch_themes]
+    if len(bullets) == 1:
+        return bullets[0]
+    return "\n\n".join(f"Part {i} of the feedback:\n{text}" for i, text in enumerate(bullets, 1) if text)
+
+
+def sentiment_counts(labels, weights=None):
+    """Counts per sentiment (optionally weighted), always with Positive/Neutral/Negative rows"""
+    frame = pd.DataFrame({"Sentiment": labels, "Count": 1 if weights is None else weights})
+    counts = frame.groupby("Sentiment", sort=False)["Count"].sum()
+    order = SENTIMENTS + ([UNKNOWN] if counts.get(UNKNOWN, 0) else [])
+    return counts.reindex(order, fill_value=0).rename_axis("Sentiment").reset_index()
+
+
+def describe_sentiment(counts):
+    """Plain-text sentiment distribution for the report"""
+    total = int(counts["Count"].sum()) or 1
+    return "\n".join(
+        f"{row.Sentiment}: {int(row.Count)} ({row.Count / total:.0%})" for row in counts.itertuples()
+    )
@@ -1,15 +1,211 @@
-import docx2txt
-import pandas as pd
+import datetime
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import docx
+import openpyxl
 import PyPDF2
 
-def extract_text_from_file(uploaded_file):
-    if uploaded_file.name.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(uploaded_file)
-        return "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-    elif uploaded_file.name.endswith(".docx"):
-        return docx2txt.process(uploaded_file)
-    elif uploaded_file.name.endswith(".xlsx"):
-        df = pd.read_excel(uploaded_file)
-        return df.to_string()
-    else:
+from utils.cache_utils import make_key
+from utils.store_utils import file_digest, get_text_store
+from utils.trace_utils import record_span
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".xlsx")
+PDF_WORKERS = int(os.getenv("GENAI_PDF_WORKERS", os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_PAGES_PER_TASK = 16
+# Workers must not be forked from the Streamlit server, whose threads may hold locks at fork time
+PDF_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Excel sheets are split into units of at most this many tokens (~4 characters each)
+XLSX_UNIT_TOKENS = int(os.getenv("GENAI_XLSX_UNIT_TOKENS", 2000))
+XLSX_DELIMITER = "|"
+# Bump when parse_units output changes, so documents extracted by an older parser are parsed again
+PARSER_VERSION = 2
+
+_worker_pdf = None
+
+
+def read_upload_bytes(uploaded_file):
+    """Raw bytes of a Streamlit upload or an open binary file"""
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(0)
+    return data
+
+
+def _init_pdf_worker(data):
+    global _worker_pdf
+    _worker_pdf = PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_pdf_range(bounds):
+    """Texts of pages [start, end) with the wall-clock time they took, for tracing"""
+    start, end = bounds
+    started = time.time()
+    return [_worker_pdf.pages[i].extract_text() or "" for i in range(start, end)], started, time.time()
+
+
+def iter_pdf_pages(data, on_progress=None, max_workers=PDF_WORKERS):
+    """Yield the text of each PDF page in order.
+
+    Large documents are split into page ranges extracted on a process pool, so extraction
+    time scales with pages / cores. on_progress(done, total) is called after every page. Each page
+    (or, on the process pool, each page range) is traced as a span of the current trace.
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    if total < PDF_PARALLEL_MIN_PAGES or max_workers <= 1:
+        for i, page in enumerate(reader.pages):
+            started = time.time()
+            text = page.extract_text() or ""
+            record_span("page", started, page=i + 1, chars=len(text))
+            yield text
+            if on_progress:
+                on_progress(i + 1, total)
+        return
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, total)) for start in range(0, total, PDF_PAGES_PER_TASK)]
+    done = 0
+    context = multiprocessing.get_context(PDF_START_METHOD)
+    if PDF_START_METHOD == "forkserver":
+        context.set_forkserver_preload([__name__])
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_pdf_worker,
+                             initargs=(data,)) as pool:
+        for (start, end), (texts, started, finished) in zip(ranges, pool.map(_extract_pdf_range, ranges)):
+            record_span("pages", started, finished, pages=f"{start + 1}-{end}", chars=sum(len(text) for text in texts))
+            for text in texts:
+                done += 1
+                yield text
+                if on_progress:
+                    on_progress(done, total)
+
+
+def _cell_text(value):
+    """Compact single-line text for one cell"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        value = value.date().isoformat()
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    return " ".join(str(value).split()).replace(XLSX_DELIMITER, "/")
+
+
+def _sheet_rows(sheet):
+    """(row number, cell texts) for every non-empty row, streamed from a read-only sheet"""
+    for number, row in enumerate(sheet.iter_rows(values_only=True), 1):
+        cells = [_cell_text(value) for value in row]
+        if any(cells):
+            yield number, cells
+
+
+def iter_xlsx_units(data, max_tokens=XLSX_UNIT_TOKENS, on_progress=None):
+    """Yield (label, text) units for every sheet of a workbook, streaming rows with openpyxl.
+
+    Rows become delimiter-joined lines with empty rows and columns dropped. The first non-empty row
+    is taken as the header and repeated at the top of each unit, and a sheet is split into as many
+    units as needed to keep each within max_tokens. on_progress(done, total) is called per sheet.
+    """
+    max_chars = max_tokens * 4
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheets = workbook.worksheets
+        for done, sheet in enumerate(sheets, 1):
+            # first pass finds the columns that hold any value, second pass emits rows
+            used = set()
+            for _, cells in _sheet_rows(sheet):
+                used.update(i for i, cell in enumerate(cells) if cell)
+            columns = sorted(used)
+            header, lines, size, first, last = None, [], 0, None, None
+            for number, cells in _sheet_rows(sheet):
+                line = XLSX_DELIMITER.join(cells[i] if i < len(cells) else "" for i in columns).rstrip(XLSX_DELIMITER)
+                if header is None:
+                    header = line
+                    continue
+                if lines and len(header) + size + len(line) > max_chars:
+                    yield f"{sheet.title} (rows {first}-{last})", "\n".join([header] + lines)
+                    lines, size = [], 0
+                if not lines:
+                    first = number
+                lines.append(line)
+                size += len(line) + 1
+                last = number
+            if lines:
+                yield f"{sheet.title} (rows {first}-{last})", "\n".join([header] + lines)
+            elif header is not None:
+                yield sheet.title, header
+            if on_progress:
+                on_progress(done, len(sheets))
+    finally:
+        workbook.close()
+
+
+def _docx_text(data):
+    """Paragraphs and tables of a Word document in body order, one line per paragraph or table row.
+
+    The cells of a row are tab-separated, so a row such as "REQ-1<tab>The system shall ..." reads
+    like a marked requirement line; a merged cell is written once.
+    """
+    lines = []
+    for block in docx.Document(io.BytesIO(data)).iter_inner_content():
+        if isinstance(block, docx.table.Table):
+            for row in block.rows:
+                cells = []
+                for cell in row.cells:
+                    if not cells or cell._tc is not cells[-1]._tc:
+                        cells.append(cell)
+                lines.append("\t".join(cell.text.strip() for cell in cells))
+        else:
+            lines.append(block.text)
+    return "\n".join(lines)
+
+
+def parse_units(name, data, on_progress=None):
+    """Parse a document into (label, text) units: one per PDF page, Excel row range, or the whole Word file"""
+    name = name.lower()
+    if name.endswith(".pdf"):
+        return [(f"Page {i + 1}", text) for i, text in enumerate(iter_pdf_pages(data, on_progress))]
+    elif name.endswith(".docx"):
+        return [("Document", _docx_text(data))]
+    elif name.endswith(".xlsx"):
+        return list(iter_xlsx_units(data, on_progress=on_progress))
+    return []
+
+
+def units_key(name, data):
+    """Key of a file's parsed units: its content plus everything that changes how it is split into units"""
+    return make_key("units", PARSER_VERSION, os.path.splitext(name)[1].lower(), XLSX_UNIT_TOKENS, file_digest(data))
+
+
+def upload_digest(uploaded_file, on_progress=None):
+    """Extract an upload into the text store if needed and return its key there (see units_key)"""
+    data = read_upload_bytes(uploaded_file)
+    digest = units_key(uploaded_file.name, data)
+    store = get_text_store()
+    if store.count(digest) is None:
+        store.put(digest, uploaded_file.name, parse_units(uploaded_file.name, data, on_progress))
+    return digest
+
+
+def extract_pages(uploaded_file, start=0, end=None, on_progress=None):
+    """Text of pages/sheets [start, end), parsed once per distinct file and then read from the store"""
+    return get_text_store().get(upload_digest(uploaded_file, on_progress), start, end)
+
+
+def extract_units(uploaded_file, on_progress=None):
+    """(label, text) of every page/sheet unit, e.g. ("Page 3", ...) or ("Backlog (rows 2-80)", ...)"""
+    digest = upload_digest(uploaded_file, on_progress)
+    store = get_text_store()
+    return list(zip(store.labels(digest), store.get(digest)))
+
+
+def extract_text_from_file(uploaded_file, on_progress=None):
+    if not uploaded_file.name.lower().endswith(SUPPORTED_EXTENSIONS):
         return "Unsupported file type"
+    return "\n".join(text for text in extract_pages(uploaded_file, on_progress=on_progress) if text)
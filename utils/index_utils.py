@@ -0,0 +1,223 @@
+import collections
+import contextlib
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from utils.cache_utils import CACHE_DIR, make_key
+from utils.llm_utils import call_openai, stream_openai
+from utils.summarize_utils import chunk_text
+
+INDEX_DIR = os.path.join(CACHE_DIR, "index")
+INDEX_MAX_BYTES = int(os.getenv("GENAI_INDEX_MAX_BYTES", 500 * 1024 * 1024))
+INDEX_TTL_SECONDS = int(os.getenv("GENAI_INDEX_TTL_SECONDS", 30 * 24 * 3600))
+INDEX_CHUNK_TOKENS = int(os.getenv("GENAI_INDEX_CHUNK_TOKENS", 250))
+TOP_K = int(os.getenv("GENAI_RETRIEVAL_TOP_K", 6))
+# Loaded indexes kept in memory per process
+INDEX_MEMORY = 8
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TERM = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with"
+    " what which who how when where why do does did can i we you they he she our your their".split()
+)
+
+FOLLOW_UP_PROMPT = (
+    "Answer the question using only the excerpts below, taken from a longer document. "
+    "Cite the excerpts you rely on by their source in brackets, e.g. [Page 3]. "
+    "If the excerpts do not contain the answer, say so.\n\n"
+    "Question: {question}\n\nExcerpts:\n{excerpts}"
+)
+
+
+def _terms(text):
+    return [term for term in TERM.findall(text.lower()) if term not in STOPWORDS]
+
+
+def _pack(strings):
+    """Strings as one UTF-8 byte array plus offsets, so they can be saved without pickling"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack(data, offsets):
+    raw = data.tobytes()
+    return [raw[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+class BM25Index:
+    """Okapi BM25 over text chunks, held as term-major sparse arrays.
+
+    Postings are stored CSC-style: the chunks containing term t are indices[indptr[t]:indptr[t + 1]]
+    and data holds their precomputed BM25 weights (idf included), so a query only touches the
+    postings of its own terms.
+    """
+
+    def __init__(self, labels, chunks, vocabulary, indptr, indices, data):
+        self.labels = labels
+        self.chunks = chunks
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def build(cls, chunks, k1=BM25_K1, b=BM25_B):
+        """Index a list of (label, text) chunks"""
+        vocabulary, rows, columns, frequencies, lengths = {}, [], [], [], []
+        for row, (_, text) in enumerate(chunks):
+            counts = collections.Counter(_terms(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                frequencies.append(frequency)
+        rows = np.array(rows, dtype=np.int32)
+        columns = np.array(columns, dtype=np.int32)
+        frequencies = np.array(frequencies, dtype=np.float32)
+        lengths = np.array(lengths, dtype=np.float32)
+
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log1p((len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norm = k1 * (1 - b + b * lengths[rows] / max(float(lengths.mean()) if len(lengths) else 0.0, 1.0))
+        weights = idf[columns] * frequencies * (k1 + 1) / (frequencies + norm)
+
+        order = np.argsort(columns, kind="stable")
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=indptr[1:])
+        return cls([label for label, _ in chunks], [text for _, text in chunks], vocabulary,
+                   indptr, rows[order], weights[order].astype(np.float32))
+
+    def search(self, query, k=TOP_K):
+        """The k best matching chunks as (score, label, text), best first; chunks sharing no term are left out"""
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term in set(_terms(query)):
+            column = self.vocabulary.get(term)
+            if column is not None:
+                start, end = self.indptr[column], self.indptr[column + 1]
+                scores[self.indices[start:end]] += self.data[start:end]
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(float(scores[i]), self.labels[i], self.chunks[i]) for i in best]
+
+    def save(self, path):
+        """Write the index to an .npz file atomically"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        arrays = {"indptr": self.indptr, "indices": self.indices, "data": self.data}
+        for name, strings in (("labels", self.labels), ("chunks", self.chunks), ("terms", terms)):
+            arrays[name], arrays[f"{name}_offsets"] = _pack(strings)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            strings = {name: _unpack(arrays[name], arrays[f"{name}_offsets"]) for name in ("labels", "chunks", "terms")}
+            return cls(strings["labels"], strings["chunks"], {term: i for i, term in enumerate(strings["terms"])},
+                       arrays["indptr"], arrays["indices"], arrays["data"])
+
+
+_indexes = collections.OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def index_path(key):
+    return os.path.join(INDEX_DIR, f"{key}-{INDEX_CHUNK_TOKENS}.npz")
+
+
+def _remember(key, index):
+    with _indexes_lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > INDEX_MEMORY:
+            _indexes.popitem(last=False)
+
+
+def _touch(path):
+    """Mark an index file as used now: its access time orders LRU eviction, its modification time is when it was built"""
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+    except FileNotFoundError:
+        pass
+
+
+def _evict(max_bytes=INDEX_MAX_BYTES, ttl=INDEX_TTL_SECONDS):
+    """Delete index files built more than ttl seconds ago, then least recently used ones beyond max_bytes"""
+    files = []
+    for entry in os.scandir(INDEX_DIR):
+        if entry.name.endswith(".npz"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_atime, stat.st_mtime, stat.st_size, entry.path))
+    now, total = time.time(), sum(size for _, _, size, _ in files)
+    for accessed, modified, size, path in sorted(files):
+        if now - modified <= ttl and total <= max_bytes:
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        total -= size
+        with _indexes_lock:
+            for key in [key for key in _indexes if index_path(key) == path]:
+                del _indexes[key]
+
+
+def build_index(units):
+    """Index (label, text) units under a hash of their text unless that index already exists.
+
+    Units are split into chunks of about INDEX_CHUNK_TOKENS tokens that keep their unit's label.
+    Index files are evicted like ResponseCache entries, after INDEX_TTL_SECONDS and least recently
+    used first beyond INDEX_MAX_BYTES. Returns the key, for get_index.
+    """
+    key = make_key("index", units)
+    path = index_path(key)
+    if os.path.exists(path):
+        _touch(path)
+        return key
+    chunks = [(label, chunk) for label, text in units for chunk in chunk_text(text, INDEX_CHUNK_TOKENS)]
+    index = BM25Index.build(chunks)
+    index.save(path)
+    _remember(key, index)
+    _evict()
+    return key
+
+
+def get_index(key):
+    """The index stored under key, from memory or disk; raises LookupError if it was never built or was evicted"""
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None:
+        try:
+            index = BM25Index.load(index_path(key))
+        except FileNotFoundError:
+            raise LookupError("This document is no longer indexed; run the analysis again to ask follow-ups.") from None
+    _touch(index_path(key))
+    _remember(key, index)
+    return index
+
+
+def answer_follow_up(question, key, top_k=TOP_K, use_cache=True, stream=False):
+    """Answer a question from the top_k chunks of an indexed document.
+
+    Only the retrieved chunks are sent to the model, whatever the document's size. Returns
+    (answer, hits): the answer is a generator of text pieces when stream is set, and hits are the
+    (score, label, text) chunks that were used.
+    """
+    hits = get_index(key).search(question, top_k)
+    excerpts = "\n\n".join(f"[{label}]\n{text}" for _, label, text in hits) or "(no matching excerpts)"
+    prompt = FOLLOW_UP_PROMPT.format(question=question.strip(), excerpts=excerpts)
+    answer = stream_openai if stream else call_openai
+    return answer(prompt, max_tokens=300, use_cache=use_cache), hits
@@ -0,0 +1,144 @@
+import collections
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache_utils import process_wide
+
+JOB_WORKERS = int(os.getenv("GENAI_JOB_WORKERS", 2))
+JOB_HISTORY = 100
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """A background pipeline run with its progress, partially streamed sections and outcome"""
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.status = QUEUED
+        self.progress = 0
+        self.message = "Queued..."
+        self.partial = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.work = None  # (fn, args, kwargs) until the job succeeds, for retry
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED)
+
+    def on_progress(self, pct, message):
+        self.progress = max(0, min(100, pct))
+        self.message = message
+
+    def on_partial(self, section, text):
+        self.partial[section] = text
+
+
+class JobQueue:
+    """Process-wide worker pool and job store shared by every Streamlit session.
+
+    Jobs are keyed by their inputs: submitting work whose key matches a known job returns that job
+    instead of starting the work again, so reruns and concurrent users uploading the same file share
+    one run. A failed job stays failed, so its error is shown rather than the work billed again on
+    every rerun, until it is explicitly retried.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, history=JOB_HISTORY):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="genai-job")
+        self.history = history
+        self.jobs = collections.OrderedDict()
+        self.by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, name=None, **kwargs):
+        """Run fn(*args, on_progress=..., on_partial=..., **kwargs) in the background and return the job id.
+
+        The call runs in a copy of the caller's context, so metric tags carry over.
+        """
+        with self._lock:
+            existing = self.jobs.get(self.by_key.get(key)) if key is not None else None
+            if existing is not None:
+                return existing.id
+            job = self._add(key, name or getattr(fn, "__name__", "job"), fn, args, kwargs)
+        self.pool.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def retry(self, job_id):
+        """Run a failed job's work again as a new job under the same key and return its id.
+
+        Any other job id is returned unchanged, so a double-clicked retry starts one run.
+        """
+        with self._lock:
+            failed = self.jobs.get(job_id)
+            if failed is None or failed.status != FAILED:
+                return job_id
+            latest = self.by_key.get(failed.key, job_id)
+            if latest != job_id:
+                return latest
+            fn, args, kwargs = failed.work
+            job = self._add(failed.key, failed.name, fn, args, kwargs)
+        self.pool.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _add(self, key, name, fn, args, kwargs):
+        job = Job(key, name)
+        job.work = (fn, args, kwargs)
+        self.jobs[job.id] = job
+        if key is not None:
+            self.by_key[key] = job.id
+        self._evict()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.started = time.time()
+        job.message = "Starting..."
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, on_progress=job.on_progress, on_partial=job.on_partial, **kwargs)
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.finished = time.time()
+            job.status = FAILED
+        else:
+            job.work = None
+            job.progress = 100
+            job.finished = time.time()
+            job.status = DONE
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the history limit; unfinished jobs are always kept"""
+        finished = [job for job in self.jobs.values() if job.done]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) == job.id:
+                del self.by_key[job.key]
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def position(self, job_id):
+        """How many queued jobs were submitted before this one"""
+        with self._lock:
+            queued = [job.id for job in self.jobs.values() if job.status == QUEUED]
+        return queued.index(job_id) if job_id in queued else 0
+
+    def stats(self):
+        with self._lock:
+            return dict(collections.Counter(job.status for job in self.jobs.values()))
+
+
+@process_wide
+def get_job_queue():
+    """The job queue running every session's analyses"""
+    return JobQueue()
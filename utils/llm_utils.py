@@ -0,0 +1,116 @@
+import json
+import time
+
+from utils.backend_utils import Completion, get_backend
+from utils.cache_utils import get_response_cache, make_key
+from utils.metrics_utils import get_metrics_registry
+from utils.store_utils import file_digest
+from utils.trace_utils import record_span
+
+MODEL = "gpt-4o-mini"  # use gpt-3.5-turbo if quota limited
+TRANSCRIPTION_MODEL = "whisper-1"
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+class LLMError(RuntimeError):
+    """A model call that still failed after retries; raised instead of returning error text"""
+
+
+def _record(kind, model, latency, **fields):
+    """Record a finished call in the metrics registry and as a span of the current trace"""
+    entry = get_metrics_registry().record(kind, model, latency, **fields)
+    record_span(kind, time.time() - latency, error=entry["error"], model=model, cache=entry["cache"],
+                prompt_tokens=entry["prompt_tokens"], completion_tokens=entry["completion_tokens"],
+                **({"audio_seconds": fields["audio_seconds"]} if fields.get("audio_seconds") is not None else {}))
+    return entry
+
+
+def call_openai(prompt, max_tokens=300, model=MODEL, system_prompt=SYSTEM_PROMPT, use_cache=True, json_schema=None):
+    """Call the chat model of the configured backend, served from the response cache when possible.
+
+    With json_schema (a JSON schema dict), the model is asked for a JSON object following it; the
+    reply is still returned as text, to be validated by the caller (see structured_utils).
+    Raises LLMError when the call fails after retries; errors are never cached.
+    """
+    cache = get_response_cache()
+    key = make_key(model, system_prompt, prompt, max_tokens, *([json_schema] if json_schema is not None else []))
+    start = time.perf_counter()
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record("chat", model, time.perf_counter() - start, cache="hit")
+            return cached
+    cache_status = "miss" if use_cache else "bypass"
+    try:
+        reply = get_backend().complete(prompt, model, system_prompt, max_tokens, json_schema)
+    except Exception as e:
+        _record("chat", model, time.perf_counter() - start, cache=cache_status, error=str(e))
+        raise LLMError(f"Model request failed: {e}") from e
+    _record("chat", model, time.perf_counter() - start, cache=cache_status,
+            prompt_tokens=reply.prompt_tokens, completion_tokens=reply.completion_tokens)
+    cache.set(key, reply.text)
+    return reply.text
+
+
+def stream_openai(prompt, max_tokens=300, model=MODEL, system_prompt=SYSTEM_PROMPT, use_cache=True):
+    """Like call_openai, but yields the reply piece by piece as tokens arrive.
+
+    A cached reply is yielded in one piece. The assembled reply is cached once the stream completes.
+    Opening the stream is retried; a stream that breaks part way raises LLMError.
+    """
+    cache = get_response_cache()
+    key = make_key(model, system_prompt, prompt, max_tokens)
+    start = time.perf_counter()
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record("chat", model, time.perf_counter() - start, cache="hit")
+            yield cached
+            return
+    cache_status = "miss" if use_cache else "bypass"
+    reply = None
+    try:
+        for piece in get_backend().stream(prompt, model, system_prompt, max_tokens):
+            if isinstance(piece, Completion):
+                reply = piece
+            else:
+                yield piece
+    except Exception as e:
+        _record("chat", model, time.perf_counter() - start, cache=cache_status, error=str(e))
+        raise LLMError(f"Model request failed: {e}") from e
+    _record("chat", model, time.perf_counter() - start, cache=cache_status,
+            prompt_tokens=reply.prompt_tokens, completion_tokens=reply.completion_tokens)
+    cache.set(key, reply.text)
+
+
+def transcribe_audio(file, audio_seconds=None, timestamps=False, use_cache=True):
+    """Transcribe audio with Whisper, served from the response cache when the same audio was transcribed before.
+
+    file is an upload/file object or a (filename, bytes) tuple. With timestamps=True the result is
+    a list of (start, end, text) segments in seconds instead of plain text. Raises LLMError when
+    the call fails after retries; errors are never cached.
+    """
+    if not isinstance(file, tuple):
+        file = (getattr(file, "name", "audio"), file.getvalue() if hasattr(file, "getvalue") else file.read())
+    cache = get_response_cache()
+    key = make_key("transcription", TRANSCRIPTION_MODEL, file_digest(file[1]), timestamps)
+    start = time.perf_counter()
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record("transcription", TRANSCRIPTION_MODEL, time.perf_counter() - start, cache="hit")
+            return [tuple(segment) for segment in json.loads(cached)] if timestamps else cached
+    cache_status = "miss" if use_cache else "bypass"
+    try:
+        transcript = get_backend().transcribe(file, TRANSCRIPTION_MODEL, timestamps, audio_seconds)
+    except Exception as e:
+        _record("transcription", TRANSCRIPTION_MODEL, time.perf_counter() - start, cache=cache_status,
+                audio_seconds=audio_seconds, error=str(e))
+        raise LLMError(f"Transcription failed: {e}") from e
+    _record("transcription", TRANSCRIPTION_MODEL, time.perf_counter() - start, cache=cache_status,
+            audio_seconds=audio_seconds if audio_seconds is not None else transcript.duration)
+    if timestamps:
+        cache.set(key, json.dumps(transcript.segments))
+        return transcript.segments
+    cache.set(key, transcript.text)
+    return transcript.text
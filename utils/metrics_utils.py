@@ -0,0 +1,123 @@
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+from utils.cache_utils import CACHE_DIR, process_wide
+
+METRICS_FILE = os.getenv("GENAI_METRICS_FILE", os.path.join(CACHE_DIR, "metrics.jsonl"))
+
+# USD per 1M tokens (input, output) for chat models, USD per minute for transcription
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+TRANSCRIPTION_PRICE_PER_MINUTE = {"whisper-1": 0.006}
+
+_tags = contextvars.ContextVar("genai_metric_tags", default={})
+
+
+@contextlib.contextmanager
+def tagged(**tags):
+    """Attach tags (session, app_mode, stage, ...) to every call recorded inside the block"""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def set_tags(**tags):
+    """Set tags for the rest of the current context, e.g. once per Streamlit script run"""
+    _tags.set({**_tags.get(), **tags})
+
+
+def current_tags():
+    """Tags of the current context, e.g. to label other records of the same work"""
+    return dict(_tags.get())
+
+
+def estimate_cost(model, prompt_tokens=0, completion_tokens=0, audio_seconds=None):
+    """Estimated USD cost of a call, or None for models without a known price"""
+    if audio_seconds is not None:
+        per_minute = TRANSCRIPTION_PRICE_PER_MINUTE.get(model)
+        return per_minute * audio_seconds / 60 if per_minute is not None else None
+    if model not in PRICES:
+        return None
+    input_price, output_price = PRICES[model]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class MetricsRegistry:
+    """In-process record of LLM/transcription calls with running totals and a JSONL sink"""
+
+    def __init__(self, path=METRICS_FILE, max_records=10000):
+        self.path = path
+        self.records = collections.deque(maxlen=max_records)
+        self.totals = collections.Counter()
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def record(self, kind, model, latency, cache="miss", prompt_tokens=0, completion_tokens=0,
+               audio_seconds=None, error=None):
+        """Record one call, tagged with the current context, and append it to the JSONL sink"""
+        entry = {
+            "ts": time.time(),
+            "kind": kind,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency": round(latency, 4),
+            "cache": cache,
+            "cost": 0.0 if cache == "hit" else estimate_cost(model, prompt_tokens, completion_tokens, audio_seconds),
+            "error": error,
+            **_tags.get(),
+        }
+        with self._lock:
+            self.records.append(entry)
+            self._add(self.totals, entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+    @staticmethod
+    def _add(totals, entry):
+        totals["calls"] += 1
+        totals["cache_hits"] += entry["cache"] == "hit"
+        totals["errors"] += entry["error"] is not None
+        totals["prompt_tokens"] += entry["prompt_tokens"]
+        totals["completion_tokens"] += entry["completion_tokens"]
+        totals["latency"] += entry["latency"]
+        totals["cost"] += entry["cost"] or 0.0
+
+    def summary(self, **tags):
+        """Totals over recorded calls matching tags; with no tags, cumulative totals for the process"""
+        with self._lock:
+            if not tags:
+                return dict(self.totals)
+            totals = collections.Counter()
+            for entry in self.records:
+                if all(entry.get(k) == v for k, v in tags.items()):
+                    self._add(totals, entry)
+        return dict(totals)
+
+    def by_stage(self, **tags):
+        """Per (app_mode, stage) totals for calls matching tags, for finding the expensive stages"""
+        groups = collections.defaultdict(collections.Counter)
+        with self._lock:
+            for entry in self.records:
+                if all(entry.get(k) == v for k, v in tags.items()):
+                    self._add(groups[(entry.get("app_mode"), entry.get("stage"))], entry)
+        return {key: dict(totals) for key, totals in groups.items()}
+
+
+@process_wide
+def get_metrics_registry():
+    """The metrics registry writing to METRICS_FILE"""
+    return MetricsRegistry()
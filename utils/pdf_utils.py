@@ -0,0 +1,189 @@
+import collections
+import functools
+import os
+import re
+import unicodedata
+
+import numpy as np
+from fpdf import FPDF, set_global
+
+from utils.cache_utils import CACHE_DIR
+
+# TrueType fonts for PDF reports; without one, reports fall back to core Arial (latin-1 only)
+PDF_FONT = os.getenv("GENAI_PDF_FONT", "")
+PDF_FONT_BOLD = os.getenv("GENAI_PDF_FONT_BOLD", "")
+# (regular, bold) fonts tried in order when GENAI_PDF_FONT is not set
+SYSTEM_FONTS = (
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("/Library/Fonts/Arial Unicode.ttf", ""),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+)
+# Parsed font metrics are pickled here by fpdf, so each font file is only parsed once
+FONT_CACHE_DIR = os.path.join(CACHE_DIR, "fonts")
+FAMILY = "report"
+# Stands in for characters the font has no glyph for until they are removed with a neighbouring space
+DROPPED = "\x00"
+STRAY_DROPPED = re.compile(r"(?:^|(?<= ))\x00+ |\x00+", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=1)
+def unicode_fonts():
+    """(regular, bold) TTF paths for reports, or None when no font is configured or installed"""
+    candidates = [(PDF_FONT, PDF_FONT_BOLD)] if PDF_FONT else SYSTEM_FONTS
+    for regular, bold in candidates:
+        if os.path.exists(regular):
+            os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+            set_global("FPDF_CACHE_MODE", 2)
+            set_global("FPDF_CACHE_DIR", FONT_CACHE_DIR)
+            return regular, bold if bold and os.path.exists(bold) else regular
+    return None
+
+
+class _Subset(list):
+    """fpdf's list of characters used with a TTF font, with set-speed membership tests.
+
+    fpdf checks every glyph of the font against this list when embedding it, which is quadratic
+    for a plain list.
+    """
+
+    def __init__(self, codes):
+        super().__init__(codes)
+        self._codes = set(codes)
+
+    def __contains__(self, code):
+        return code in self._codes
+
+
+class _Glyphs(dict):
+    """str.translate table that marks characters the font cannot draw with DROPPED, decided once per character"""
+
+    def __init__(self, has_glyph):
+        super().__init__()
+        self.has_glyph = has_glyph
+
+    def __missing__(self, code):
+        self[code] = value = code if self.has_glyph(code) else DROPPED
+        return value
+
+
+class _Buffer:
+    """fpdf's output buffer, which it grows with +=: kept as a list so that is not quadratic"""
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+
+    def __iadd__(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        return self
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return "".join(self.parts)
+
+
+class ReportPDF(FPDF):
+    """FPDF that lays out long text itself, straight onto the page, in time linear in its length.
+
+    multi_cell measures, encodes and records every character in Python, and fpdf grows its output
+    and font subsets in ways that are quadratic in the document size. Here each block of text is
+    measured at once from the font's width table (a cumulative sum over its code points), lines
+    are broken with binary searches, and each line is written as a single text object. With a
+    TrueType font any Unicode text the font covers is kept; characters without a glyph (e.g.
+    emoji) are dropped.
+    """
+
+    def __init__(self, fonts=None):
+        super().__init__()
+        self.buffer = _Buffer()
+        self.unicode = fonts is not None
+        if self.unicode:
+            self.add_font(FAMILY, "", fonts[0], uni=True)
+            self.add_font(FAMILY, "B", fonts[1], uni=True)
+        self._metrics = {}
+        self._used = collections.defaultdict(set)
+
+    def use_font(self, style, size):
+        self.set_font(FAMILY if self.unicode else "Arial", style, size)
+
+    def _font_metrics(self):
+        """(key, glyph filter, width of each code point in 1/1000 of the font size) for the current font"""
+        key = self.current_font["fontkey"] if self.unicode else self.font_family + self.font_style
+        if key not in self._metrics:
+            cw = self.current_font["cw"]
+            if self.unicode:
+                widths = np.array(cw, dtype=np.int64)
+                widths[widths == 65535] = 0
+                has_glyph = lambda code: code == 10 or (code < len(cw) and cw[code] not in (0, 65535))
+            else:
+                widths = np.zeros(256, dtype=np.int64)
+                for char, width in cw.items():
+                    widths[ord(char)] = width
+                has_glyph = lambda code: code < 256 and chr(code) in cw
+            self._metrics[key] = (_Glyphs(has_glyph), widths)
+        return (key,) + self._metrics[key]
+
+    def text_block(self, text, height, align="L"):
+        """Write text in the current font, wrapped to the page width, starting new pages as needed"""
+        key, glyphs, widths = self._font_metrics()
+        text = unicodedata.normalize("NFC", text).replace("\r", "").replace("\t", "    ").translate(glyphs)
+        if DROPPED in text:
+            text = STRAY_DROPPED.sub("", text)  # no stray spaces where characters were dropped
+        if align == "C":
+            text = "\n".join(" ".join(line.split()) for line in text.split("\n"))
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        self._used[key].update(np.unique(codes).tolist())
+        cumulative = np.zeros(len(codes) + 1, dtype=np.int64)
+        np.cumsum(widths[codes], out=cumulative[1:])
+        spaces = np.flatnonzero(codes == 32)
+        # whole font units, so searches stay in the integer dtype of the cumulative widths
+        limit = int((self.w - self.l_margin - self.r_margin - 2 * self.c_margin) * 1000 / self.font_size)
+        start = 0
+        for end in np.flatnonzero(codes == 10).tolist() + [len(codes)]:
+            self._layout_line(text, cumulative, spaces, start, end, limit, height, align)
+            start = end + 1
+
+    def _layout_line(self, text, cumulative, spaces, start, end, limit, height, align):
+        """Greedy word wrap of text[start:end], breaking at the last space that fits"""
+        while cumulative[end] - cumulative[start] > limit:
+            fits = int(cumulative.searchsorted(cumulative[start] + limit, side="right")) - 1
+            space = int(spaces.searchsorted(fits, side="right")) - 1
+            if space >= 0 and spaces[space] > start:
+                cut, resume = int(spaces[space]), int(spaces[space]) + 1
+            else:  # a word wider than the line is broken wherever it overflows
+                cut = resume = max(fits, start + 1)
+            self._put_line(text[start:cut], cumulative[cut] - cumulative[start], height, align)
+            start = resume
+        self._put_line(text[start:end], cumulative[end] - cumulative[start], height, align)
+
+    def _put_line(self, line, width, height, align):
+        if self.y + height > self.page_break_trigger:
+            self.add_page()
+        if line:
+            if align == "C":
+                x = (self.w - width * self.font_size / 1000) / 2
+            else:
+                x = self.l_margin + self.c_margin
+            encoded = line.encode("utf-16-be").decode("latin-1") if self.unicode else line
+            baseline = self.h - (self.y + 0.5 * height + 0.3 * self.font_size)
+            self._out(f"BT {x * self.k:.2f} {baseline * self.k:.2f} Td ({self._escape(encoded)}) Tj ET")
+        self.y += height
+        self.x = self.l_margin
+
+    def _putfonts(self):
+        # embed only the characters that were written, see _Subset
+        for key, font in self.fonts.items():
+            if font.get("type") == "TTF":
+                font["subset"] = _Subset(sorted(set(font["subset"]) | self._used[key]))
+        super()._putfonts()
+
+    def output(self, name="", dest=""):
+        if self.state < 3:
+            self.close()
+        self.buffer = str(self.buffer)
+        return super().output(name, dest)
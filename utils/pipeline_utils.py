@@ -0,0 +1,133 @@
+import contextlib
+import contextvars
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics_utils import tagged
+from utils.trace_utils import span
+
+MAX_WORKERS = int(os.getenv("GENAI_MAX_WORKERS", 4))
+# Request all report sections in one structured call instead of one streamed call each: "auto" when
+# nothing is streamed to a viewer (batch runs, benchmarks), "1" always, "0" never
+STRUCTURED_OUTPUT = os.getenv("GENAI_STRUCTURED_OUTPUT", "auto").lower()
+
+
+def use_structured(stream):
+    """Whether a pipeline run requests its report sections in one structured call (see STRUCTURED_OUTPUT)"""
+    if STRUCTURED_OUTPUT in ("1", "true", "yes"):
+        return True
+    if STRUCTURED_OUTPUT in ("0", "false", "no"):
+        return False
+    return not stream
+
+
+@contextlib.contextmanager
+def stage(name, **attributes):
+    """Tag the calls made in the block with stage=name and trace the block as a span; yields the Span"""
+    with tagged(stage=name), span(name, **attributes) as current:
+        yield current
+
+
+def run_stages(stages, on_stage_done=None, placeholders=None, max_workers=MAX_WORKERS):
+    """Run independent stages concurrently on a bounded thread pool.
+
+    stages maps a stage name to a zero-argument callable. A stage that returns a generator of
+    text pieces (e.g. stream_openai) is streamed: its pieces are rendered into placeholders[name]
+    as they arrive and its result is the assembled text. on_stage_done(name, done, total) and
+    all rendering happen in the calling thread, so both may touch Streamlit elements.
+    Returns a dict of results keyed by stage name.
+    """
+    results = {}
+    if not stages:
+        return results
+    placeholders = placeholders or {}
+    events = queue.Queue()
+    streamed = {name: "" for name in stages}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(stages)))) as pool:
+        for name, fn in stages.items():
+            pool.submit(contextvars.copy_context().run, _run_stage, name, fn, events)
+        while len(results) < len(stages):
+            batch = [events.get()]
+            while not events.empty():
+                batch.append(events.get_nowait())
+            updated = set()
+            for name, value, finished in batch:
+                if not finished:
+                    streamed[name] += value
+                    updated.add(name)
+                    continue
+                if isinstance(value, BaseException):
+                    raise value
+                results[name] = value
+                updated.discard(name)
+                if name in placeholders and isinstance(value, str):
+                    placeholders[name].markdown(value)
+                if on_stage_done:
+                    on_stage_done(name, len(results), len(stages))
+            for name in updated:
+                if name in placeholders:
+                    placeholders[name].markdown(streamed[name] + " ▌")
+    return results
+
+
+def _run_stage(name, fn, events):
+    """Worker side of run_stages: report streamed pieces, then the final result or exception"""
+    try:
+        with stage(name):
+            result = fn()
+            if hasattr(result, "__next__"):
+                pieces = []
+                for piece in result:
+                    pieces.append(piece)
+                    events.put((name, piece, False))
+                result = "".join(pieces).strip()
+    except BaseException as e:
+        events.put((name, e, True))
+    else:
+        events.put((name, result, True))
+
+
+def map_in_context(pool, fn, items):
+    """Like pool.map, but each call runs in a copy of the caller's context so metric tags carry over"""
+    futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def stage_progress(on_progress, steps_before, total_steps):
+    """Callback for run_stages that reports overall progress as each stage completes"""
+    def on_stage_done(name, done, total):
+        step = steps_before + done
+        on_progress(int(100 * step / total_steps), f"Step {step}/{total_steps}: {name} done")
+    return on_stage_done
+
+
+def page_progress(on_progress, label, start_pct, end_pct):
+    """Callback for per-page extraction that reports progress between two percentages"""
+    def on_page(done, total):
+        on_progress(start_pct + int((end_pct - start_pct) * done / max(total, 1)), f"{label} (page {done}/{total})")
+    return on_page
+
+
+def segment_progress(on_progress, on_partial, label, start_pct, end_pct):
+    """Callback for transcribe_long_audio that reports progress and the partial transcript"""
+    def on_segment(text, done, total):
+        on_progress(start_pct + int((end_pct - start_pct) * done / max(total, 1)), f"{label} (segment {done}/{total})")
+        on_partial("Transcript", text)
+    return on_segment
+
+
+class _Section:
+    """run_stages placeholder that forwards rendered stage text to an on_partial callback"""
+
+    def __init__(self, on_partial, name):
+        self.on_partial = on_partial
+        self.name = name
+
+    def markdown(self, text):
+        self.on_partial(self.name, text)
+
+
+def section_placeholders(on_partial, names):
+    """Placeholders for run_stages that report each stage's streamed text as on_partial(name, text)"""
+    return {name: _Section(on_partial, name) for name in names}
@@ -0,0 +1,330 @@
+"""The four apps as plain functions, shared by the Streamlit pages, the batch CLI and the benchmarks.
+
+Each pipeline imports what it needs when it first runs, so importing this module (and rendering a
+page that has not started an analysis yet) does not load pandas, the OpenAI SDK or the document
+libraries.
+"""
+from utils.pipeline_utils import (
+    page_progress, run_stages, section_placeholders, segment_progress, stage, stage_progress, use_structured,
+)
+from utils.trace_utils import traced
+
+# File types accepted by each app
+EXTENSIONS = {
+    "meeting": (".mp3", ".wav", ".m4a"),
+    "requirements": (".pdf", ".docx", ".xlsx"),
+    "feedback": (".csv",),
+    "regulatory": (".pdf",),
+}
+
+
+def _ignore(*args):
+    pass
+
+
+def _require_text(uploaded_file, units):
+    """Raise ValueError when extraction found no text, so an empty report is never written as a success"""
+    if not any(text.strip() for _, text in units):
+        raise ValueError(f"No text could be extracted from {uploaded_file.name}")
+
+
+def _index(units):
+    """Search index over the analyzed (label, text) units for follow-up questions, keyed by their text"""
+    from utils.index_utils import build_index
+
+    with stage("Index", units=len(units)):
+        return build_index(units)
+
+
+def _report_sections(prompt, schema, text, sections, use_cache, stream, on_progress, on_partial):
+    """Report sections over text, sections mapping a name to (schema field, prompt, max_tokens).
+
+    When the sections are streamed, each is its own concurrent call, shown as it is written.
+    Otherwise (see use_structured) all sections are requested in one structured call, so the text
+    (or, when long, its map-reduce notes) is sent once, and a section that still fails validation
+    falls back to its own prompt. Returns the sections' text by name.
+    """
+    from utils.summarize_utils import map_reduce_summarize, structured_summarize
+
+    def separately(names):
+        return run_stages({
+            name: lambda name=name: map_reduce_summarize(sections[name][1], text, max_tokens=sections[name][2],
+                                                         use_cache=use_cache, stream=stream)
+            for name in names
+        }, on_stage_done=stage_progress(on_progress, 1, 3), placeholders=section_placeholders(on_partial, names))
+
+    if not use_structured(stream):
+        return separately(list(sections))
+    with stage(" + ".join(sections)):
+        values, failed = structured_summarize(prompt, schema, text, max_tokens=sum(tokens for _, _, tokens in sections.values()),
+                                              use_cache=use_cache)
+    results = {}
+    for name, (field, _, _) in sections.items():
+        if field in values:
+            value = values[field]
+            results[name] = "\n".join(f"- {item}" for item in value) if isinstance(value, list) else value
+            on_partial(name, results[name])
+    results.update(separately([name for name, (field, _, _) in sections.items() if field in failed]))
+    return results
+
+
+@traced("meeting")
+def run_meeting(uploaded_file, use_cache=True, on_progress=None, on_partial=None):
+    """Transcribe a meeting recording, then summarize it and extract action items.
+
+    on_progress(pct, message) reports overall progress and on_partial(section, text) receives the
+    transcript and each stage's text as it streams in; both are called from the calling thread.
+    """
+    from utils.audio_utils import transcribe_long_audio
+    from utils.structured_utils import MeetingReport
+
+    on_progress, stream = on_progress or _ignore, on_partial is not None
+    on_partial = on_partial or _ignore
+
+    # Step 1: Transcription
+    on_progress(0, "Step 1/3: Transcribing audio...")
+    with stage("Transcription") as current:
+        text = transcribe_long_audio(uploaded_file, use_cache=use_cache, on_partial=segment_progress(
+            on_progress, on_partial, "Step 1/3: Transcribing audio...", 0, 33))
+        current.set(chars=len(text))
+    on_progress(33, "Steps 2-3/3: Summarizing meeting and extracting action items...")
+
+    # Steps 2-3: Summary and action items
+    results = _report_sections("Summarize this meeting and extract its action items:", MeetingReport, text, {
+        "Summary": ("summary", "Summarize this meeting:", 200),
+        "Action items": ("action_items", "Extract action items from this meeting:", 150),
+    }, use_cache, stream, on_progress, on_partial)
+    index = _index([("Transcript", text)])
+    on_progress(100, "✅ Done! Meeting processed successfully.")
+    return {
+        "title": "Meeting Report",
+        "basename": "meeting_report",
+        "sections": {
+            "📋 Meeting Summary": results["Summary"],
+            "📝 Action Items": results["Action items"],
+            "📄 Transcript": text,
+        },
+        "transcript": text,
+        "index": index,
+    }
+
+
+@traced("requirements")
+def run_requirements(uploaded_file, use_cache=True, on_progress=None, on_partial=None):
+    """Split a requirements document into items and write a user story for each.
+
+    Stories are generated in parallel batches and cached per requirement, so re-running an edited
+    document only sends the changed requirements to the model (see stories_utils). Raises
+    ValueError when no text can be extracted from the document.
+    """
+    from utils.file_utils import extract_units
+    from utils.stories_utils import generate_stories, split_requirements, stories_markdown
+
+    on_progress, on_partial = on_progress or _ignore, on_partial or _ignore
+
+    # Step 1: Extract text and split it into requirements
+    on_progress(0, "Step 1/2: Extracting requirements from document...")
+    with stage("Extraction") as current:
+        units = extract_units(uploaded_file, on_progress=page_progress(
+            on_progress, "Step 1/2: Extracting requirements from document...", 0, 20))
+        _require_text(uploaded_file, units)
+        items = split_requirements(units, tabular=uploaded_file.name.lower().endswith(".xlsx"))
+        current.set(units=len(units), chars=sum(len(text) for _, text in units), requirements=len(items))
+    message = f"Step 2/2: Writing user stories for {len(items)} requirements..."
+    on_progress(20, message)
+
+    # Step 2: One user story per requirement
+    def stories_progress(done, total, stories):
+        on_progress(20 + 80 * done // max(total, 1), message)
+        on_partial("User stories", stories_markdown(stories))
+
+    with stage("User stories", requirements=len(items)):
+        stories = generate_stories(items, use_cache=use_cache, on_progress=stories_progress)
+    index = _index(units)
+    on_progress(100, "✅ Done! Requirements converted into user stories.")
+    return {
+        "title": "User Stories",
+        "basename": "user_stories",
+        "sections": {"📑 User Stories": stories_markdown(stories) or "No requirements found in the document."},
+        "stories": stories,
+        "index": index,
+    }
+
+
+@traced("feedback")
+def run_feedback(uploaded_file, use_cache=True, on_progress=None, on_partial=None):
+    """Collapse near-duplicate comments, then classify sentiment and identify key themes.
+
+    Raises ValueError when the CSV has no feedback column.
+    """
+    from utils.dedupe_utils import collapse_near_duplicates
+    from utils.feedback_utils import (
+        classify_sentiment, classify_with_themes, describe_sentiment, read_feedback, sentiment_counts, theme_notes,
+        weighted_lines,
+    )
+    from utils.summarize_utils import map_reduce_summarize
+
+    on_progress, stream = on_progress or _ignore, on_partial is not None
+    on_partial = on_partial or _ignore
+
+    # Step 1: Collect feedback rows
+    on_progress(0, "Step 1/3: Preparing feedback data...")
+    with stage("Preparation") as current:
+        feedback_df = read_feedback(uploaded_file)
+        clusters_df = collapse_near_duplicates(feedback_df)
+        current.set(comments=int(feedback_df["count"].sum()), unique=len(feedback_df), clusters=len(clusters_df))
+    feedback = clusters_df["feedback"].tolist()
+    on_progress(33, "Steps 2-3/3: Classifying sentiment per comment and identifying key themes...")
+
+    if not use_structured(stream):
+        # Steps 2-3: Per-row sentiment (validated labels) and the streamed themes run concurrently
+        results = run_stages({
+            "Sentiment analysis": lambda: classify_sentiment(feedback, use_cache=use_cache),
+            "Key themes": lambda: map_reduce_summarize("Identify top 3 recurring themes in this customer feedback:", weighted_lines(clusters_df), use_cache=use_cache, stream=stream),
+        }, on_stage_done=stage_progress(on_progress, 1, 3), placeholders=section_placeholders(on_partial, ["Key themes"]))
+    else:
+        # Step 2: Sentiment per comment and the themes of each batch, from one call per batch of comments
+        with stage("Sentiment analysis + Key themes", clusters=len(clusters_df)):
+            labels, batch_themes = classify_with_themes(feedback, clusters_df["count"], use_cache=use_cache)
+        on_progress(67, "Step 3/3: Merging key themes...")
+
+        # Step 3: Merge the batches' themes; one batch's themes need no further call
+        notes = theme_notes(batch_themes)
+        if len(batch_themes) > 1:
+            results = run_stages({
+                "Key themes": lambda: map_reduce_summarize("Identify top 3 recurring themes in this customer feedback, from the themes noted in each part of it:", notes, use_cache=use_cache, stream=stream),
+            }, placeholders=section_placeholders(on_partial, ["Key themes"]))
+        else:
+            results = {"Key themes": notes or "No recurring themes found."}
+            on_partial("Key themes", results["Key themes"])
+        results["Sentiment analysis"] = labels
+    counts = sentiment_counts(results["Sentiment analysis"], clusters_df["count"])
+    sentiment = describe_sentiment(counts)
+    on_partial("Sentiment analysis", sentiment)
+    index = _index([("Feedback", weighted_lines(clusters_df))])
+    on_progress(100, "✅ Done! Feedback analysis complete.")
+    return {
+        "title": "Customer Feedback Analysis",
+        "basename": "customer_feedback",
+        "sections": {
+            "📊 Sentiment Analysis": sentiment,
+            "✨ Key Themes": results["Key themes"],
+        },
+        "feedback": feedback_df,
+        "clusters": clusters_df,
+        "sentiment_counts": counts,
+        "index": index,
+    }
+
+
+@traced("regulatory")
+def run_regulatory(uploaded_file, use_cache=True, on_progress=None, on_partial=None, previous_file=None):
+    """Extract a regulation page by page, then summarize it and its business impact.
+
+    With previous_file, only the sections that changed since that version are summarized (see
+    _run_regulatory_diff). Raises ValueError when no text can be extracted from a version.
+    """
+    if previous_file is not None:
+        return _run_regulatory_diff(previous_file, uploaded_file, use_cache, on_progress, on_partial)
+
+    from utils.file_utils import extract_units
+    from utils.structured_utils import RegulationReport
+
+    on_progress, stream = on_progress or _ignore, on_partial is not None
+    on_partial = on_partial or _ignore
+
+    # Step 1: Extract text
+    on_progress(0, "Step 1/3: Extracting regulation text...")
+    with stage("Extraction") as current:
+        units = extract_units(uploaded_file, on_progress=page_progress(
+            on_progress, "Step 1/3: Extracting regulation text...", 0, 33))
+        _require_text(uploaded_file, units)
+        current.set(pages=len(units), chars=sum(len(text) for _, text in units))
+    pages = [text for _, text in units]
+    on_progress(33, "Steps 2-3/3: Summarizing regulation and identifying business impacts...")
+
+    # Steps 2-3: Summary and business impact analysis
+    results = _report_sections("Summarize this regulation in simple business terms and identify its business and compliance impacts:", RegulationReport, pages, {
+        "Summary": ("summary", "Summarize this regulation in simple business terms:", 250),
+        "Business impact": ("business_impact", "What are the business and compliance impacts of this regulation?", 250),
+    }, use_cache, stream, on_progress, on_partial)
+    index = _index(units)
+    on_progress(100, "✅ Done! Regulation analyzed successfully.")
+    return {
+        "title": "Regulatory Change Summary",
+        "basename": "regulatory_summary",
+        "sections": {
+            "📌 Summary": results["Summary"],
+            "💡 Business Impact": results["Business impact"],
+        },
+        "index": index,
+    }
+
+
+def _run_regulatory_diff(previous_file, uploaded_file, use_cache, on_progress, on_partial):
+    """Compare two versions of a regulation section by section and summarize only what changed.
+
+    Sections are matched and fingerprinted locally, so the model sees the changed sections (with a
+    sentence of context around each edit) and token use follows the size of the change rather than
+    the size of the regulation. When nothing changed, no model call is made.
+    """
+    from utils.diff_utils import change_excerpt, changes_markdown, diff_sections, split_sections
+    from utils.file_utils import extract_pages, extract_units
+    from utils.structured_utils import RegulationReport
+
+    on_progress, stream = on_progress or _ignore, on_partial is not None
+    on_partial = on_partial or _ignore
+
+    # Step 1: Extract both versions and compare their sections
+    on_progress(0, "Step 1/3: Extracting and comparing both versions...")
+    with stage("Extraction", version="previous"):
+        previous_pages = extract_pages(previous_file, on_progress=page_progress(
+            on_progress, "Step 1/3: Extracting previous version...", 0, 15))
+        _require_text(previous_file, [("Previous", text) for text in previous_pages])
+        previous = split_sections(previous_pages)
+    with stage("Extraction", version="current") as extraction:
+        units = extract_units(uploaded_file, on_progress=page_progress(
+            on_progress, "Step 1/3: Extracting current version...", 15, 30))
+        _require_text(uploaded_file, units)
+        current = split_sections([text for _, text in units])
+        extraction.set(pages=len(units), chars=sum(len(text) for _, text in units))
+    with stage("Comparison", sections=len(current)) as comparison:
+        changes = diff_sections(previous, current)
+        comparison.set(changes=len(changes))
+    unchanged = len(current) - sum(change.kind != "removed" for change in changes)
+    overview = changes_markdown(changes, unchanged)
+    on_partial("Changes", overview)
+
+    excerpts = [change_excerpt(change) for change in changes]
+    if excerpts:
+        # Steps 2-3: Summary and business impact of the changes
+        on_progress(33, f"Steps 2-3/3: Summarizing {len(changes)} changed section(s) and their business impact...")
+        results = _report_sections("Summarize what changed in this new version of the regulation, in simple business terms, and identify the business and compliance impacts of these changes:", RegulationReport, excerpts, {
+            "Summary": ("summary", "Summarize what changed in this new version of the regulation, in simple business terms:", 250),
+            "Business impact": ("business_impact", "What are the business and compliance impacts of these changes to the regulation?", 250),
+        }, use_cache, stream, on_progress, on_partial)
+    else:
+        results = {"Summary": "The two versions have the same content.", "Business impact": "No new impact: nothing changed."}
+        on_partial("Summary", results["Summary"])
+        on_partial("Business impact", results["Business impact"])
+    index = _index(units)
+    on_progress(100, "✅ Done! Regulation changes analyzed successfully.")
+    return {
+        "title": "Regulatory Change Summary",
+        "basename": "regulatory_changes",
+        "sections": {
+            "🔀 Changed Sections": overview,
+            "📌 Summary of Changes": results["Summary"],
+            "💡 Business Impact": results["Business impact"],
+        },
+        "changes": changes,
+        "index": index,
+    }
+
+
+PIPELINES = {
+    "meeting": run_meeting,
+    "requirements": run_requirements,
+    "feedback": run_feedback,
+    "regulatory": run_regulatory,
+}
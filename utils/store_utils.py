@@ -0,0 +1,121 @@
+import contextlib
+import hashlib
+import os
+import sqlite3
+import time
+
+from utils.cache_utils import CACHE_DIR, process_wide
+
+STORE_MAX_BYTES = int(os.getenv("GENAI_STORE_MAX_BYTES", 500 * 1024 * 1024))
+STORE_TTL_SECONDS = int(os.getenv("GENAI_STORE_TTL_SECONDS", 30 * 24 * 3600))
+
+
+def file_digest(data):
+    """SHA-256 of the uploaded bytes, used as the document key"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class TextStore:
+    """SQLite store of extracted text, one row per PDF page, Word document or Excel sheet.
+
+    Documents are evicted like ResponseCache entries: after ttl seconds, and least recently used
+    first once the stored text exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=STORE_MAX_BYTES, ttl=STORE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+            if columns and "accessed" not in columns:
+                # written before eviction, under keys that did not cover the parser settings
+                conn.execute("DROP TABLE documents")
+                conn.execute("DROP TABLE IF EXISTS units")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " digest TEXT PRIMARY KEY, name TEXT, units INTEGER NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_accessed ON documents (accessed)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS units ("
+                " digest TEXT NOT NULL, idx INTEGER NOT NULL, label TEXT, text TEXT NOT NULL,"
+                " PRIMARY KEY (digest, idx))"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def count(self, digest):
+        """Number of stored pages/sheets for a document, or None if it was never extracted or has expired"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT units, created FROM documents WHERE digest = ?", (digest,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._delete(conn, [digest])
+                row = None
+            if row:
+                conn.execute("UPDATE documents SET accessed = ? WHERE digest = ?", (now, digest))
+        return row[0] if row else None
+
+    def put(self, digest, name, units):
+        """Store a list of (label, text) units for a document in a single transaction, then evict
+        expired and least recently used documents"""
+        now = time.time()
+        rows = [(digest, idx, label, text or "") for idx, (label, text) in enumerate(units)]
+        size = sum(len(text.encode("utf-8")) for _, _, _, text in rows)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM units WHERE digest = ?", (digest,))
+            conn.executemany("INSERT INTO units (digest, idx, label, text) VALUES (?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (digest, name, units, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, name, len(units), size, now, now),
+            )
+            expired = conn.execute("SELECT digest FROM documents WHERE created < ?", (now - self.ttl,)).fetchall()
+            self._delete(conn, [row[0] for row in expired])
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+            if total > self.max_bytes:
+                stale = []
+                for old_digest, old_size in conn.execute(
+                        "SELECT digest, size FROM documents WHERE digest != ? ORDER BY accessed", (digest,)).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    stale.append(old_digest)
+                    total -= old_size
+                self._delete(conn, stale)
+
+    @staticmethod
+    def _delete(conn, digests):
+        conn.executemany("DELETE FROM units WHERE digest = ?", [(digest,) for digest in digests])
+        conn.executemany("DELETE FROM documents WHERE digest = ?", [(digest,) for digest in digests])
+
+    def get(self, digest, start=0, end=None):
+        """Return the text of units [start, end) without loading the rest of the document"""
+        query = "SELECT text FROM units WHERE digest = ? AND idx >= ?"
+        params = [digest, start]
+        if end is not None:
+            query += " AND idx < ?"
+            params.append(end)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY idx", params).fetchall()
+        return [row[0] for row in rows]
+
+    def labels(self, digest):
+        """Page/sheet labels for a document, in order"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT label FROM units WHERE digest = ? ORDER BY idx", (digest,)).fetchall()
+        return [row[0] for row in rows]
+
+
+@process_wide
+def get_text_store():
+    """The extracted-text store under CACHE_DIR"""
+    return TextStore(os.path.join(CACHE_DIR, "extracted.sqlite3"))
@@ -0,0 +1,208 @@
+import contextvars
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.cache_utils import get_response_cache, make_key
+from utils.llm_utils import MODEL
+from utils.metrics_utils import tagged
+from utils.pipeline_utils import MAX_WORKERS
+from utils.structured_utils import StoryBatch, request_sections
+
+STORY_BATCH_SIZE = 8
+TOKENS_PER_STORY = 200
+MAX_ITEM_CHARS = 1500
+MIN_ITEM_WORDS = 3
+
+STORY_PROMPT = "Convert each numbered requirement into an Agile user story with acceptance criteria."
+
+# "3.", "3)", "3.1", "3.1.2." / "REQ-12", "FR-3:" / "a)", "(iv)" / bullets
+ITEM_MARKER = re.compile(
+    r"^(?:(?P<ref>\d+(?:\.\d+)*[.)]|\d+(?:\.\d+)+|[A-Z]{2,}[A-Z0-9]*-\d+[:.)]?|[a-z][.)]|\([a-z0-9]{1,4}\))"
+    r"|[-*•▪●◦‣])\s+(?P<text>\S.*)$"
+)
+REQUIREMENT_VERB = re.compile(r"\b(shall|must|should|will|needs? to|is required to|can|may)\b", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+
+def _is_heading(text):
+    """A short title-like line: few words, no closing punctuation and no requirement verb"""
+    text = text.lstrip("#").strip()
+    return (0 < len(text.split()) <= 8 and not text.endswith((".", ";", ":", ",", "?", "!"))
+            and not REQUIREMENT_VERB.search(text))
+
+
+def _item(ref, text, source, section):
+    return {"ref": ref, "text": " ".join(text.split())[:MAX_ITEM_CHARS], "source": source, "section": section}
+
+
+def _split_marked(lines, source):
+    """Items start at numbered clauses, IDs and bullets; other lines continue the current item.
+
+    A title-like line is a section heading when the next line starts an item, and a numbered one
+    when the next item is one of its subclauses (e.g. "3. Security" followed by "3.1 ...").
+    """
+    matches = [ITEM_MARKER.match(line) for line in lines]
+    items, section, current = [], None, None
+    for i, (line, match) in enumerate(zip(lines, matches)):
+        following = matches[i + 1] if i + 1 < len(matches) else None
+        if match:
+            ref = (match.group("ref") or "").strip("().:")
+            next_ref = (following.group("ref") or "").strip("().:") if following else ""
+            if ref and next_ref.startswith(f"{ref}.") and _is_heading(match.group("text")):
+                section, current = f"{ref} {match.group('text')}", None
+                continue
+            current = _item(ref or None, match.group("text"), source, section)
+            items.append(current)
+        elif line.startswith("#") or (_is_heading(line) and (following or current is None)):
+            section, current = line.lstrip("#").strip(), None
+        elif current is not None:
+            current["text"] = _item(None, f"{current['text']} {line}", source, section)["text"]
+        elif REQUIREMENT_VERB.search(line):
+            current = _item(None, line, source, section)
+            items.append(current)
+    return items
+
+
+def _split_prose(lines, source):
+    """Without markers, each sentence stating a requirement starts an item; others continue it"""
+    items, section, paragraph = [], None, []
+
+    def flush():
+        sentences = SENTENCE_END.split(" ".join(paragraph))
+        has_verbs = any(REQUIREMENT_VERB.search(sentence) for sentence in sentences)
+        current = None
+        for sentence in sentences:
+            if current is None or not has_verbs or REQUIREMENT_VERB.search(sentence):
+                current = _item(None, sentence, source, section)
+                items.append(current)
+            else:
+                current["text"] = _item(None, f"{current['text']} {sentence}", source, section)["text"]
+        paragraph.clear()
+
+    for line in lines:
+        if _is_heading(line):
+            if paragraph:
+                flush()
+            section = line.lstrip("#").strip()
+        else:
+            paragraph.append(line)
+    if paragraph:
+        flush()
+    return items
+
+
+def _split_rows(text, source):
+    """One item per spreadsheet row, as 'Header: value' pairs (see file_utils.iter_xlsx_units)"""
+    header, *rows = text.split("\n")
+    columns = header.split("|")
+    items = []
+    for row in rows:
+        values = row.split("|")
+        ref = values[0] if values and re.fullmatch(r"[A-Za-z]*[-_]?\d+(?:\.\d+)*", values[0]) else None
+        pairs = [f"{column}: {value}" if column else value for column, value in zip(columns, values) if value]
+        items.append(_item(ref, "; ".join(pairs), source, None))
+    return items
+
+
+def split_requirements(units, tabular=False):
+    """Split extracted (label, text) units into requirement items, in document order.
+
+    Spreadsheet units (tabular=True) give one item per row. Text is split at numbered clauses,
+    requirement IDs and bullets, with short title-like lines kept as the section of the items that
+    follow; text without such markers is split into sentences that state a requirement. Each item
+    is a dict with ref (clause number or ID, if any), text, source (page/sheet label) and section.
+    """
+    items = []
+    for label, text in units:
+        if not text.strip():
+            continue
+        if tabular:
+            items.extend(_split_rows(text, label))
+            continue
+        lines = [" ".join(line.split()) for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        marked = any(ITEM_MARKER.match(line) for line in lines)
+        items.extend(_split_marked(lines, label) if marked else _split_prose(lines, label))
+    return [item for item in items if len(item["text"].split()) >= MIN_ITEM_WORDS]
+
+
+def _story_key(item):
+    return make_key("story", MODEL, STORY_PROMPT, item["text"])
+
+
+def _generate_batch(batch, use_cache=True):
+    """Story dicts for a batch of requirement items from one structured call; a missing or invalid story is None"""
+    lines = "\n".join(f"{i}. {item['text']}" for i, item in enumerate(batch, 1))
+    values, _ = request_sections(f"{STORY_PROMPT}\n\n{lines}", StoryBatch,
+                                 max_tokens=TOKENS_PER_STORY * len(batch) + 50, use_cache=use_cache)
+    stories = values.get("stories", {})
+    return [stories.get(str(i)) for i in range(1, len(batch) + 1)]
+
+
+def _with_source(item, story):
+    source = " · ".join(part for part in (item["source"], item["section"], item["ref"]) if part)
+    if story is None:
+        return {"story": None, "acceptance_criteria": [], "source": source, "requirement": item["text"]}
+    return {**story, "source": source, "requirement": item["text"]}
+
+
+def generate_stories(items, batch_size=STORY_BATCH_SIZE, max_workers=MAX_WORKERS, use_cache=True, on_progress=None):
+    """One user story per requirement item, in item order, generated in parallel batches.
+
+    Each item's story is cached under the item's own text, so re-uploading an edited document only
+    sends the new or changed requirements to the model. Items the model skipped are retried once on
+    their own; a story that still fails comes back with story=None. on_progress(done, total, stories)
+    is called from the calling thread as batches finish, with None for items still pending.
+    """
+    cache = get_response_cache()
+    stories = [None] * len(items)
+    pending = []
+    for i, item in enumerate(items):
+        cached = cache.get(_story_key(item)) if use_cache else None
+        if cached is not None:
+            stories[i] = _with_source(item, json.loads(cached))
+        else:
+            pending.append(i)
+    done = len(items) - len(pending)
+    if on_progress:
+        on_progress(done, len(items), stories)
+
+    def run(indices):
+        return indices, _generate_batch([items[i] for i in indices], use_cache)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, tagged(step="stories"):
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        futures = [pool.submit(contextvars.copy_context().run, run, batch) for batch in batches]
+        retry = []
+        while futures:
+            for future in as_completed(futures):
+                indices, results = future.result()
+                for i, story in zip(indices, results):
+                    if story is None and len(indices) > 1:
+                        retry.append(i)
+                        continue
+                    if story is not None:
+                        cache.set(_story_key(items[i]), json.dumps(story))
+                    stories[i] = _with_source(items[i], story)
+                    done += 1
+                if on_progress:
+                    on_progress(done, len(items), stories)
+            futures = [pool.submit(contextvars.copy_context().run, run, [i]) for i in retry]
+            retry = []
+    return stories
+
+
+def stories_markdown(stories):
+    """Stories in document order as Markdown, skipping ones not generated yet"""
+    blocks = []
+    for number, story in enumerate(stories, 1):
+        if story is None:
+            continue
+        if story["story"] is None:
+            blocks.append(f"**{number}.** _No story could be generated for this requirement; run it again to retry._\n\n"
+                          f"> {story['requirement']}\n\n_Source: {story['source']}_")
+            continue
+        criteria = "\n".join(f"- {criterion}" for criterion in story["acceptance_criteria"])
+        blocks.append(f"**{number}. {story['story']}**\n\n{criteria}\n\n_Source: {story['source']}_")
+    return "\n\n".join(blocks)
@@ -0,0 +1,124 @@
+import json
+import re
+from typing import Annotated, Literal
+
+from pydantic import (
+    AfterValidator, BaseModel, BeforeValidator, ConfigDict, Field, ValidationError, WrapValidator, create_model,
+)
+
+from utils.llm_utils import call_openai
+
+# Calls per request: the first asks for every section, later ones only for the sections still invalid
+STRUCTURED_ATTEMPTS = 3
+
+Sentiment = Annotated[Literal["Positive", "Neutral", "Negative"], BeforeValidator(lambda label: str(label).strip().capitalize())]
+
+
+def lenient(default=None):
+    """Validator making an invalid value default instead, e.g. for one entry of a dict, so it does not fail the whole field"""
+    def validate(value, handler):
+        try:
+            return handler(value)
+        except ValidationError:
+            return default
+    return WrapValidator(validate)
+
+
+class MeetingReport(BaseModel):
+    """Summary and action items of a meeting"""
+
+    summary: str = Field(min_length=1, description="a concise summary of the meeting in a few sentences")
+    action_items: list[str] = Field(description="each action item agreed in the meeting, with its owner and due date when stated")
+
+
+class RegulationReport(BaseModel):
+    """Summary and business impact of a regulation, or of the changes to it"""
+
+    summary: str = Field(min_length=1, description="a summary in simple business terms")
+    business_impact: str = Field(min_length=1, description="the business and compliance impacts")
+
+
+class FeedbackSentiments(BaseModel):
+    """Sentiment of each numbered comment"""
+
+    # a comment with an invalid label is left unlabeled (None) rather than the whole batch re-requested
+    sentiments: dict[str, Annotated[Sentiment, lenient()]] = Field(
+        description='the sentiment of each comment by its number, for example {"1": "Positive", "2": "Negative"}')
+
+
+class FeedbackBatch(FeedbackSentiments):
+    """Sentiment of each numbered comment and the themes they share"""
+
+    themes: list[str] = Field(
+        description="up to 3 recurring themes in these comments, each with roughly how many comments mention it, "
+                    "counting a comment marked [Nx] N times")
+
+
+class UserStory(BaseModel):
+    """An Agile user story with its acceptance criteria"""
+
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    story: str = Field(min_length=1, description='one "As a ..., I want ..., so that ..." sentence')
+    acceptance_criteria: Annotated[list[str], AfterValidator(lambda criteria: [item for item in criteria if item])] = Field(
+        description="short, testable criteria")
+
+
+class StoryBatch(BaseModel):
+    """A user story for each numbered requirement"""
+
+    # an invalid story is left out (None) and retried on its own rather than the whole batch re-requested
+    stories: dict[str, Annotated[UserStory, lenient()]] = Field(
+        description='the user story for each requirement by its number, for example '
+                    '{"1": {"story": "As a ..., I want ..., so that ...", "acceptance_criteria": ["..."]}}')
+
+
+def json_instructions(schema):
+    """Prompt text describing the JSON object to reply with, one line per field"""
+    fields = "\n".join(f'- "{name}": {field.description}' for name, field in schema.model_fields.items())
+    return f"Reply with only a JSON object with these keys:\n{fields}"
+
+
+def _sections_schema(schema, names):
+    """schema reduced to the given fields, for re-requesting just those"""
+    return create_model(schema.__name__, __doc__=schema.__doc__,
+                        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names})
+
+
+def validate_sections(schema, reply):
+    """(valid field values, names of missing or invalid fields) for a JSON reply to schema"""
+    names = list(schema.model_fields)
+    match = re.search(r"\{.*\}", reply, re.DOTALL)
+    try:
+        data = json.loads(match.group(0)) if match else None
+    except json.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
+        return {}, names
+    try:
+        return schema.model_validate(data).model_dump(), []
+    except ValidationError as e:
+        failed = {error["loc"][0] for error in e.errors() if error["loc"]} or set(names)
+    valid = [name for name in names if name not in failed and name in data]
+    values = _sections_schema(schema, valid).model_validate({name: data[name] for name in valid}).model_dump() if valid else {}
+    return values, [name for name in names if name in failed]
+
+
+def request_sections(prompt, schema, max_tokens=500, use_cache=True, attempts=STRUCTURED_ATTEMPTS):
+    """Ask for every field of a pydantic schema in one call, validating the reply field by field.
+
+    Fields that are missing or fail validation are re-requested on their own with the same prompt,
+    up to attempts calls in all, so one bad section does not cost a full retry. Returns (values,
+    failed): the validated values by field name and the names of fields that never validated.
+    """
+    values, pending = {}, list(schema.model_fields)
+    for attempt in range(1, attempts + 1):
+        requested = schema if len(pending) == len(schema.model_fields) else _sections_schema(schema, pending)
+        retry = f"\n\nThis is attempt {attempt} of {attempts}; earlier replies had no valid {', '.join(pending)}." if attempt > 1 else ""
+        reply = call_openai(f"{prompt}\n\n{json_instructions(requested)}{retry}", max_tokens=max_tokens,
+                            use_cache=use_cache, json_schema=requested.model_json_schema())
+        valid, pending = validate_sections(requested, reply)
+        values.update(valid)
+        if not pending:
+            break
+    return values, pending
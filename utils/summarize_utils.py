@@ -0,0 +1,101 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.backend_utils import CHARS_PER_TOKEN, estimate_tokens
+from utils.llm_utils import call_openai, stream_openai
+from utils.metrics_utils import tagged
+from utils.pipeline_utils import MAX_WORKERS, map_in_context
+from utils.structured_utils import request_sections
+from utils.trace_utils import span
+
+CHUNK_TOKENS = int(os.getenv("GENAI_CHUNK_TOKENS", 6000))
+MAP_MAX_TOKENS = 400
+
+MAP_PROMPT = (
+    "The following is part {part} of {parts} of a longer document. "
+    "Write concise notes that keep every detail relevant to this task: {task}"
+)
+REDUCE_PROMPT = (
+    "The following are notes taken from consecutive parts of a longer document. "
+    "Merge them into one set of concise notes that keeps every detail relevant to this task: {task}"
+)
+
+
+def _split_oversized(segment, max_tokens):
+    """Split a segment that alone exceeds the budget on line, then character, boundaries"""
+    if estimate_tokens(segment) <= max_tokens:
+        return [segment]
+    lines = segment.split("\n")
+    if len(lines) > 1:
+        return [piece for line in lines for piece in _split_oversized(line, max_tokens)]
+    width = max_tokens * CHARS_PER_TOKEN
+    return [segment[i:i + width] for i in range(0, len(segment), width)]
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    """Pack paragraphs (or a list of pages) into chunks that each fit within max_tokens"""
+    segments = text if isinstance(text, list) else re.split(r"\n\s*\n", text)
+    chunks, current, current_tokens = [], [], 0
+    for segment in segments:
+        for piece in _split_oversized(segment.strip(), max_tokens):
+            if not piece:
+                continue
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _final_prompt(prompt, text, chunk_tokens, max_workers, use_cache):
+    """Prompt for the final call: the text itself if it fits one chunk, otherwise merged notes"""
+    chunks = chunk_text(text, chunk_tokens)
+    if len(chunks) <= 1:
+        body = "\n".join(text) if isinstance(text, list) else text
+        return f"{prompt}\n\n{body}"
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        with tagged(step="map"), span("map", chunks=len(chunks)):
+            notes = map_in_context(pool, lambda item: call_openai(
+                f"{MAP_PROMPT.format(part=item[0], parts=len(chunks), task=prompt.rstrip(':'))}\n\n{item[1]}",
+                max_tokens=MAP_MAX_TOKENS, use_cache=use_cache), list(enumerate(chunks, 1)))
+        while True:
+            groups = chunk_text(notes, chunk_tokens)
+            if len(groups) <= 1 or len(groups) >= len(notes):
+                break
+            with tagged(step="reduce"), span("reduce", groups=len(groups)):
+                notes = map_in_context(pool, lambda group: call_openai(
+                    f"{REDUCE_PROMPT.format(task=prompt.rstrip(':'))}\n\n{group}",
+                    max_tokens=MAP_MAX_TOKENS, use_cache=use_cache), groups)
+    return f"{prompt}\n\n" + "\n\n".join(notes)
+
+
+def map_reduce_summarize(prompt, text, max_tokens=300, chunk_tokens=CHUNK_TOKENS,
+                         max_workers=MAX_WORKERS, use_cache=True, stream=False):
+    """Answer prompt over text of any length.
+
+    Text that fits in one chunk is sent as a single call, exactly as before. Longer text is
+    split into chunks, each chunk is condensed into task-focused notes in parallel, and the
+    notes are merged level by level until they fit into one final call. With stream=True the
+    final answer is returned as a generator of text pieces (see stream_openai).
+    """
+    final_prompt = _final_prompt(prompt, text, chunk_tokens, max_workers, use_cache)
+    answer = stream_openai if stream else call_openai
+    return answer(final_prompt, max_tokens=max_tokens, use_cache=use_cache)
+
+
+def structured_summarize(prompt, schema, text, max_tokens=500, chunk_tokens=CHUNK_TOKENS,
+                         max_workers=MAX_WORKERS, use_cache=True):
+    """Answer every field of a pydantic schema over text of any length, sending the text once.
+
+    Long text is condensed into notes for the whole prompt as in map_reduce_summarize, then all
+    fields are requested in one structured call (see structured_utils.request_sections).
+    Returns (values, failed).
+    """
+    final_prompt = _final_prompt(prompt, text, chunk_tokens, max_workers, use_cache)
+    return request_sections(final_prompt, schema, max_tokens=max_tokens, use_cache=use_cache)
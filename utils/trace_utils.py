@@ -0,0 +1,133 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+
+from utils.cache_utils import CACHE_DIR, process_wide
+from utils.metrics_utils import current_tags
+
+# One span per line, with OTLP/JSON field names (traceId, spanId, startTimeUnixNano, ...); empty to keep spans in memory only
+TRACE_FILE = os.getenv("GENAI_TRACE_FILE", os.path.join(CACHE_DIR, "traces.jsonl"))
+
+_current = contextvars.ContextVar("genai_trace_span", default=None)
+
+
+class Span:
+    """One timed operation in a trace, with attributes such as input size and an OK/ERROR outcome"""
+
+    def __init__(self, name, parent=None, attributes=None, start=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        # a trace's root span carries the metric tags (session, app_mode, batch, ...) it was started under
+        self.attributes = {**(current_tags() if parent is None else {}), **(attributes or {})}
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": int(self.start * 1e9),
+            "endTimeUnixNano": int(self.end * 1e9),
+            "attributes": self.attributes,
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_OK"},
+        }
+
+
+class Tracer:
+    """In-process record of finished spans with a JSONL sink, queried per trace for the waterfall panel"""
+
+    def __init__(self, path=TRACE_FILE, max_spans=50000):
+        self.path = path
+        self.spans = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def add(self, span):
+        entry = span.to_dict()
+        with self._lock:
+            self.spans.append(entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        return entry
+
+    def trace(self, trace_id):
+        """Finished spans of one trace, in start order"""
+        with self._lock:
+            spans = [entry for entry in self.spans if entry["traceId"] == trace_id]
+        return sorted(spans, key=lambda entry: entry["startTimeUnixNano"])
+
+    def recent(self, limit=10, **attributes):
+        """The latest finished root spans whose attributes match, newest first"""
+        with self._lock:
+            roots = [entry for entry in reversed(self.spans) if not entry["parentSpanId"]
+                     and all(entry["attributes"].get(k) == v for k, v in attributes.items())]
+        return roots[:limit]
+
+
+@process_wide
+def get_tracer():
+    """The tracer writing to TRACE_FILE"""
+    return Tracer()
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Trace the block as a span, a child of the current span (or a new trace's root).
+
+    Yields the Span so attributes learned inside the block (e.g. output sizes) can be added. Work
+    submitted to threads with contextvars.copy_context (map_in_context, run_stages) is traced
+    under it. Not for use across the yields of a generator; see record_span.
+    """
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end = time.time()
+        get_tracer().add(current)
+
+
+def record_span(name, start, end=None, error=None, **attributes):
+    """Add a span timed elsewhere (epoch seconds; end defaults to now) under the current span.
+
+    Outside any span nothing is recorded, so e.g. pages extracted outside a pipeline do not each
+    become a trace of their own.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    finished = Span(name, parent, attributes, start=start)
+    finished.end = time.time() if end is None else end
+    finished.error = error
+    return get_tracer().add(finished)
+
+
+def traced(name):
+    """Decorator that runs each call of a function in its own span"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
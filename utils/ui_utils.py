@@ -0,0 +1,206 @@
+import io
+import os
+import time
+
+import streamlit as st
+
+from utils.cache_utils import make_key
+from utils.export_utils import docx_bytes, pdf_bytes, report_digest
+from utils.job_utils import FAILED, QUEUED, get_job_queue
+from utils.pipeline_utils import stage
+from utils.store_utils import file_digest
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PDF_MIME = "application/pdf"
+POLL_SECONDS = float(os.getenv("GENAI_JOB_POLL_SECONDS", 1))
+# Longer traces (e.g. page by page extraction of a long PDF) show their first spans only
+WATERFALL_MAX_SPANS = 200
+
+
+def report_downloads(report_content, title, basename, author="Analyst", labels=("Report", "Report")):
+    """Word/PDF download buttons that render each format in memory, only once it is requested.
+
+    A format is built after its "Prepare" button is clicked and stays available for the
+    session; rendering is memoized per report content, so reruns do not rebuild it.
+    """
+    digest = report_digest(report_content, title, author)
+    formats = [
+        ("Word", "docx", DOCX_MIME, docx_bytes, labels[0]),
+        ("PDF", "pdf", PDF_MIME, pdf_bytes, labels[1]),
+    ]
+    for column, (name, ext, mime, render, label) in zip(st.columns(len(formats)), formats):
+        with column:
+            requested = f"export_{ext}_{digest}"
+            if st.session_state.get(requested) or st.button(f"📄 Prepare {name} {label}", key=f"prepare_{requested}"):
+                st.session_state[requested] = True
+                st.download_button(f"⬇️ Download {name} {label}", render(report_content, title, author),
+                                   file_name=f"{basename}.{ext}", mime=mime, on_click="ignore",
+                                   key=f"download_{requested}")
+
+
+def _copy_upload(uploaded_file):
+    upload = io.BytesIO(uploaded_file.getvalue())
+    upload.name = uploaded_file.name
+    return upload
+
+
+def submit_upload(state_key, pipeline, uploaded_file, use_cache=True, previous_file=None):
+    """Run a pipeline on an upload as a background job, once per distinct file, tracked in the session.
+
+    The job id is kept in st.session_state[state_key], so the job and its results outlive widget
+    interactions and app switches. previous_file, when given, is passed on to the pipeline (e.g. an
+    earlier version to compare against) and is part of what makes the job distinct. Returns the
+    session's job for state_key, or None.
+    """
+    queue = get_job_queue()
+    if uploaded_file is not None:
+        upload, kwargs, name = _copy_upload(uploaded_file), {"use_cache": use_cache}, uploaded_file.name
+        digests = [file_digest(upload.getvalue())]
+        if previous_file is not None:
+            kwargs["previous_file"] = _copy_upload(previous_file)
+            digests.append(file_digest(kwargs["previous_file"].getvalue()))
+            name = f"{previous_file.name} → {uploaded_file.name}"
+        key = make_key(pipeline.__name__, *digests, use_cache)
+        st.session_state[state_key] = queue.submit(pipeline, upload, key=key, name=name, **kwargs)
+    return queue.get(st.session_state.get(state_key))
+
+
+def _render_sections(partial, headings, running):
+    for name, heading in headings.items():
+        text = partial.get(name)
+        if heading:
+            st.subheader(heading)
+            if text:
+                st.markdown(text)
+        elif running and text:
+            st.text(text)  # plain-text preview, e.g. the transcript while it is being produced
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def _job_progress(job_id, headings):
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.progress(job.progress)
+    if job.status == QUEUED:
+        st.text(f"Queued behind {queue.position(job_id)} other job(s)...")
+    else:
+        st.text(f"{job.message} ({time.time() - job.started:.0f}s)")
+    _render_sections(dict(job.partial), headings, running=True)
+
+
+def job_view(job, headings):
+    """Progress and sections of a background job, polled every POLL_SECONDS while it runs.
+
+    headings maps a section name (as reported through on_partial) to its subheader; a section
+    without a heading is a plain-text preview shown only while the job runs. The script is not
+    blocked while polling and reruns once the job finishes. A failed job shows its error and a
+    Retry button; it is not run again otherwise. Returns the pipeline result once the job has
+    succeeded, otherwise None.
+    """
+    if not job.done:
+        _job_progress(job.id, headings)
+        return None
+    if job.status == FAILED:
+        st.error(job.error)
+        st.button("🔁 Retry", key=f"retry_{job.id}", on_click=get_job_queue().retry, args=(job.id,))
+        return None
+    st.progress(100)
+    st.text(job.message)
+    _render_sections(job.partial, headings, running=False)
+    return job.result
+
+
+def follow_up_box(state_key, index_key, use_cache=True):
+    """"Ask a follow-up" box answering questions about an analyzed document from its search index.
+
+    Each question sends only the most relevant chunks of the document to the model (see
+    index_utils). Questions and answers are kept per document in st.session_state[state_key].
+    """
+    from utils.index_utils import answer_follow_up
+    from utils.llm_utils import LLMError
+
+    st.subheader("💬 Ask a follow-up")
+    history = st.session_state.setdefault(state_key, {}).setdefault(index_key, [])
+    for question, answer, sources in history:
+        st.markdown(f"**Q:** {question}")
+        st.markdown(answer)
+        st.caption(f"Sources: {sources}")
+    with st.form(f"{state_key}_form", clear_on_submit=True):
+        question = st.text_input("Question about this document")
+        asked = st.form_submit_button("Ask")
+    if not (asked and question.strip()):
+        return
+    st.markdown(f"**Q:** {question}")
+    try:
+        with stage("Follow-up"):
+            reply, hits = answer_follow_up(question, index_key, use_cache=use_cache, stream=True)
+            answer = st.write_stream(reply)
+    except (LookupError, LLMError) as e:
+        st.error(str(e))
+        return
+    sources = ", ".join(dict.fromkeys(label for _, label, _ in hits)) or "none found"
+    st.caption(f"Sources: {sources}")
+    history.append((question, answer, sources))
+
+
+def _span_depths(spans):
+    """Nesting depth of each span of a trace by span id, the root being 0"""
+    parents = {entry["spanId"]: entry["parentSpanId"] for entry in spans}
+    depths = {}
+    for span_id in parents:
+        depth, parent = 0, parents[span_id]
+        while parent in parents:
+            depth, parent = depth + 1, parents[parent]
+        depths[span_id] = depth
+    return depths
+
+
+def trace_panel(session):
+    """Waterfall of one of this session's recent traced runs: stages, pages, model calls and exports"""
+    import json
+
+    import altair as alt
+    import pandas as pd
+
+    from utils.trace_utils import TRACE_FILE, get_tracer
+
+    tracer = get_tracer()
+    roots = tracer.recent(session=session)
+    if not roots:
+        st.caption("No finished runs in this session yet.")
+        return
+    labels = [
+        f"{i}. {root['name']} · {time.strftime('%H:%M:%S', time.localtime(root['startTimeUnixNano'] / 1e9))} · "
+        f"{(root['endTimeUnixNano'] - root['startTimeUnixNano']) / 1e9:.2f}s"
+        for i, root in enumerate(roots, 1)
+    ]
+    root = roots[labels.index(st.selectbox("Run", labels, key="trace_run"))]
+    spans = tracer.trace(root["traceId"])
+    depths = _span_depths(spans)
+    origin = root["startTimeUnixNano"]
+    frame = pd.DataFrame([
+        {
+            "Span": f"{i}. {'· ' * depths[entry['spanId']]}{entry['name']}",
+            "Start": (entry["startTimeUnixNano"] - origin) / 1e9,
+            "End": (entry["endTimeUnixNano"] - origin) / 1e9,
+            "Seconds": round((entry["endTimeUnixNano"] - entry["startTimeUnixNano"]) / 1e9, 4),
+            "Status": "error" if entry["status"]["code"] == "STATUS_CODE_ERROR" else "ok",
+            "Details": json.dumps(entry["attributes"], ensure_ascii=False, default=str),
+        }
+        for i, entry in enumerate(spans[:WATERFALL_MAX_SPANS], 1)
+    ])
+    chart = alt.Chart(frame).mark_bar().encode(
+        x=alt.X("Start", title="seconds"),
+        x2="End",
+        y=alt.Y("Span", sort=None, title=None),
+        color=alt.Color("Status", scale=alt.Scale(domain=["ok", "error"], range=["#4c78a8", "#e45756"]), legend=None),
+        tooltip=["Span", "Seconds", "Status", "Details"],
+    ).properties(height=18 * len(frame) + 20)
+    st.altair_chart(chart, use_container_width=True)
+    if len(spans) > WATERFALL_MAX_SPANS:
+        st.caption(f"Showing the first {WATERFALL_MAX_SPANS} of {len(spans)} spans.")
+    if TRACE_FILE:
+        st.caption(f"All spans are appended to {TRACE_FILE}")
+